@@ -0,0 +1,109 @@
+"""partition dataset tables by month on date_from
+
+Revision ID: 20261019_090000
+Revises: 20251006_140930
+Create Date: 2026-10-19 09:00:00
+
+Converts the five dataset tables into ``PARTITION BY RANGE (date_from)``
+parents with one partition per month present in the data. The primary key
+becomes ``(id, date_from)`` because Postgres requires unique constraints on a
+partitioned table to include the partition key; ``id`` keeps its sequence and
+stays unique. New months are created at ingest (``app.partitions``).
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_090000"
+down_revision = "20251006_140930"
+branch_labels = None
+depends_on = None
+
+
+# table -> (extra column DDL, {index name: columns})
+TABLES = {
+    "google_data": (
+        "account_name varchar(255), campaign varchar(255), cost numeric(14, 2)",
+        {"ix_google_data_campaign": "campaign", "ix_google_data_date": "date_from, date_to, report_type"},
+    ),
+    "rumble_data": (
+        "campaign varchar(255), spend numeric(14, 2), cpm numeric(14, 2)",
+        {"ix_rumble_data_campaign": "campaign", "ix_rumble_data_date": "date_from, date_to, report_type"},
+    ),
+    "binom_rumble_spent_data": (
+        "name varchar(255), leads integer, revenue numeric(14, 2)",
+        {
+            "ix_binom_rumble_spent_name": "name",
+            "ix_binom_rumble_spent_date": "date_from, date_to, report_type",
+        },
+    ),
+    "binom_google_spent_data": (
+        "name varchar(255), leads integer, revenue numeric(14, 2)",
+        {
+            "ix_binom_google_spent_name": "name",
+            "ix_binom_google_spent_date": "date_from, date_to, report_type",
+        },
+    ),
+    "rumble_campaign_data": (
+        "name varchar(255), cpm numeric(14, 2), daily_limit numeric(14, 2)",
+        {"ix_rumble_campaign_name": "name", "ix_rumble_campaign_date": "date_from, date_to, report_type"},
+    ),
+}
+
+BASE_COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('{table}_id_seq'),
+    date_from date NOT NULL,
+    date_to date NOT NULL,
+    report_type varchar(16) NOT NULL,
+    upload_id integer NOT NULL REFERENCES uploads (id) ON DELETE CASCADE,
+    created_at timestamp with time zone NOT NULL DEFAULT now(),
+    {extra},
+"""
+
+
+def _rebuild(table: str, extra: str, indexes: dict[str, str], partitioned: bool) -> None:
+    old = f"{table}_old"
+    # Move the existing table (and its index names) out of the way
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    op.execute(f'ALTER INDEX "{table}_pkey" RENAME TO "{old}_pkey"')
+    for name in indexes:
+        op.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+    columns = BASE_COLUMNS.format(table=table, extra=extra)
+    if partitioned:
+        op.execute(
+            f'CREATE TABLE "{table}" ({columns} PRIMARY KEY (id, date_from)) PARTITION BY RANGE (date_from)'
+        )
+        op.execute(
+            f"""
+            DO $$
+            DECLARE m date;
+            BEGIN
+                FOR m IN SELECT DISTINCT date_trunc('month', date_from)::date FROM "{old}" LOOP
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                        '{table}_p' || to_char(m, 'YYYY_MM'), '{table}', m, (m + interval '1 month')::date
+                    );
+                END LOOP;
+            END $$;
+            """
+        )
+    else:
+        op.execute(f'CREATE TABLE "{table}" ({columns} PRIMARY KEY (id))')
+
+    op.execute(f'ALTER SEQUENCE "{table}_id_seq" OWNED BY "{table}".id')
+    op.execute(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    op.execute(f'DROP TABLE "{old}"')
+    for name, cols in indexes.items():
+        op.execute(f'CREATE INDEX "{name}" ON "{table}" ({cols})')
+
+
+def upgrade() -> None:
+    for table, (extra, indexes) in TABLES.items():
+        _rebuild(table, extra, indexes, partitioned=True)
+
+
+def downgrade() -> None:
+    for table, (extra, indexes) in TABLES.items():
+        _rebuild(table, extra, indexes, partitioned=False)
@@ -0,0 +1,37 @@
+"""index upload_id on dataset tables
+
+Revision ID: 20261019_100000
+Revises: 20261019_090000
+Create Date: 2026-10-19 10:00:00
+
+Without these, deleting an upload (ON DELETE CASCADE or the batched
+delete-by-upload endpoint) scans every dataset table.
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_100000"
+down_revision = "20261019_090000"
+branch_labels = None
+depends_on = None
+
+TABLES = [
+    "google_data",
+    "rumble_data",
+    "binom_rumble_spent_data",
+    "binom_google_spent_data",
+    "rumble_campaign_data",
+]
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        # Created on the partitioned parent, so every month partition gets one
+        op.create_index(f"ix_{table}_upload_id", table, ["upload_id"])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_upload_id", table_name=table)
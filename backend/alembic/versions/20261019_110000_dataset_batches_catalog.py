@@ -0,0 +1,69 @@
+"""dataset_batches catalog
+
+Revision ID: 20261019_110000
+Revises: 20261019_100000
+Create Date: 2026-10-19 11:00:00
+
+One row per (source, date_from, date_to, report_type), maintained by ingest
+and deletes so that GET /api/<source>/batches is an index lookup. Backfilled
+from the existing dataset tables.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_110000"
+down_revision = "20261019_100000"
+branch_labels = None
+depends_on = None
+
+# source -> (table, spend expression, revenue expression)
+SOURCES = {
+    "google": ("google_data", "d.cost", "0"),
+    "rumble": ("rumble_data", "d.spend", "0"),
+    "binom-rumble": ("binom_rumble_spent_data", "0", "d.revenue"),
+    "binom-google": ("binom_google_spent_data", "0", "d.revenue"),
+    "rumble-campaign": ("rumble_campaign_data", "0", "0"),
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dataset_batches",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("source", sa.String(length=50), nullable=False),
+        sa.Column("date_from", sa.Date(), nullable=False),
+        sa.Column("date_to", sa.Date(), nullable=False),
+        sa.Column("report_type", sa.String(length=16), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("spend_total", sa.Numeric(16, 2), nullable=False, server_default="0"),
+        sa.Column("revenue_total", sa.Numeric(16, 2), nullable=False, server_default="0"),
+        sa.Column("first_uploaded_at", sa.DateTime(timezone=True)),
+        sa.Column("last_uploaded_at", sa.DateTime(timezone=True)),
+        sa.Column("upload_ids", sa.JSON(), nullable=False, server_default="[]"),
+        sa.UniqueConstraint("source", "date_from", "date_to", "report_type", name="uq_dataset_batches_key"),
+    )
+    op.create_index("ix_dataset_batches_source_date", "dataset_batches", ["source", "date_from", "id"])
+
+    for source, (table, spend, revenue) in SOURCES.items():
+        op.execute(
+            f"""
+            INSERT INTO dataset_batches (
+                source, date_from, date_to, report_type, row_count, spend_total, revenue_total,
+                first_uploaded_at, last_uploaded_at, upload_ids
+            )
+            SELECT '{source}', d.date_from, d.date_to, d.report_type, count(*),
+                   coalesce(sum({spend}), 0), coalesce(sum({revenue}), 0),
+                   min(u.uploaded_at), max(u.uploaded_at), json_agg(DISTINCT d.upload_id)
+            FROM {table} d
+            JOIN uploads u ON u.id = d.upload_id
+            GROUP BY d.date_from, d.date_to, d.report_type
+            """
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dataset_batches_source_date", table_name="dataset_batches")
+    op.drop_table("dataset_batches")
@@ -0,0 +1,24 @@
+"""invoices (invoice_date, id) index for keyset pagination
+
+Revision ID: 20261019_120000
+Revises: 20261019_110000
+Create Date: 2026-10-19 12:00:00
+
+"""
+from __future__ import annotations
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261019_120000"
+down_revision = "20261019_110000"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_invoices_date_id", "invoices", ["invoice_date", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoices_date_id", table_name="invoices")
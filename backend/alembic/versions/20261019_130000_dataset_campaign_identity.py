@@ -0,0 +1,52 @@
+"""campaign_id / name_key on google_data and binom_google_spent_data
+
+Revision ID: 20261019_130000
+Revises: 20261019_120000
+Create Date: 2026-10-19 13:00:00
+
+The Google–Binom report matches on the campaign ID when present, else on
+the sanitized name (app.services.matching). Both are now extracted once at
+ingest and indexed; existing rows are backfilled here with the same rules
+(``YYMMDD_NN`` token; lowercase alphanumerics).
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261019_130000"
+down_revision = "20261019_120000"
+branch_labels = None
+depends_on = None
+
+# table -> column holding the campaign name
+TABLES = {
+    "google_data": "campaign",
+    "binom_google_spent_data": "name",
+}
+
+
+def upgrade() -> None:
+    for table, name_col in TABLES.items():
+        op.add_column(table, sa.Column("campaign_id", sa.String(length=32), nullable=True))
+        op.add_column(table, sa.Column("name_key", sa.String(length=255), nullable=True))
+        op.execute(
+            f"""
+            UPDATE {table}
+            SET campaign_id = substring({name_col} from '(?<![0-9])([0-9]{{6}}_[0-9]{{1,4}})(?![0-9])'),
+                name_key = regexp_replace(lower({name_col}), '[^a-z0-9]', '', 'g')
+            WHERE {name_col} IS NOT NULL
+            """
+        )
+        # Created on the partitioned parent, so every month partition gets one
+        op.create_index(f"ix_{table}_campaign_id", table, ["campaign_id"])
+        op.create_index(f"ix_{table}_name_key", table, ["name_key"])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_name_key", table_name=table)
+        op.drop_index(f"ix_{table}_campaign_id", table_name=table)
+        op.drop_column(table, "name_key")
+        op.drop_column(table, "campaign_id")
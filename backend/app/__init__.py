@@ -1,31 +1,63 @@
-import os
-from flask import Flask, g, jsonify
-from flask_cors import CORS
-from .config import Settings
-from .db import SessionLocal
-from .routes.health import bp as health_bp
-from .routes.uploads import bp as uploads_bp
-from .routes.reports import bp as reports_bp
-from .routes.invoices import bp as invoices_bp
-
-
-def create_app() -> Flask:
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flask import Flask
+
+
+def create_app() -> "Flask":
+    # Imports live here so `import app` (Alembic, scripts, models) stays cheap
+    from flask import Flask, g, jsonify
+    from flask.ctx import _AppCtxGlobals
+    from flask_cors import CORS
+    from sqlalchemy.engine import Engine
+
+    from .config import Settings
+    from .json_provider import make_json_provider
+    from .db import get_session
+    from .slowlog import install_slow_query_log
+    from .routes.health import bp as health_bp
+    from .routes.uploads import bp as uploads_bp
+    from .routes.reports import bp as reports_bp
+    from .routes.invoices import bp as invoices_bp
+    from .routes.admin import bp as admin_bp
+    from .routes.jobs import bp as jobs_bp
+
     settings = Settings()  # loads from environment
 
     app = Flask(__name__)
+    app.json = make_json_provider(app, settings.JSON_PROVIDER)
     app.config["SECRET_KEY"] = settings.SECRET_KEY
+    app.config["DELETE_BATCH_SIZE"] = settings.DELETE_BATCH_SIZE
+    app.config["INVOICE_NUMBER_BLOCK"] = settings.INVOICE_NUMBER_BLOCK
+    app.config["COMPRESS_MIN_SIZE"] = settings.COMPRESS_MIN_SIZE
+    app.config["COMPRESS_LEVEL"] = settings.COMPRESS_LEVEL
+    app.config["REPORT_CACHE_MB"] = settings.REPORT_CACHE_MB
+    app.config["MAX_CONTENT_LENGTH"] = settings.MAX_UPLOAD_MB * 1024 * 1024
 
     # CORS: allow frontend origin (configure VITE origin in production)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-    # DB session lifecycle per request
-    @app.before_request
-    def _create_session():
-        g.db = SessionLocal()
+    # Slow statements are logged with their route and get a captured plan.
+    # Listening on the Engine class avoids building the engine here.
+    install_slow_query_log(Engine, settings)
+
+    # DB session lifecycle per request: `g.db` is opened on first access, so
+    # requests that never touch the database (e.g. /health) skip it entirely.
+    class _Globals(_AppCtxGlobals):
+        def __getattr__(self, name: str):
+            if name == "db":
+                db = get_session()
+                self.db = db
+                return db
+            return super().__getattr__(name)
+
+    app.app_ctx_globals_class = _Globals
 
     @app.teardown_request
     def _shutdown_session(exception=None):
-        db = getattr(g, "db", None)
+        db = g.pop("db", None)
         if db is None:
             return
         try:
@@ -41,6 +73,20 @@ def create_app() -> Flask:
     app.register_blueprint(uploads_bp, url_prefix="/api")
     app.register_blueprint(reports_bp, url_prefix="/api")
     app.register_blueprint(invoices_bp, url_prefix="/api")
+    app.register_blueprint(admin_bp, url_prefix="/api")
+    app.register_blueprint(jobs_bp, url_prefix="/api")
+
+    @app.errorhandler(413)
+    def _too_large(exc):
+        return (
+            jsonify(
+                {
+                    "error": "request body too large",
+                    "max_bytes": app.config["MAX_CONTENT_LENGTH"],
+                }
+            ),
+            413,
+        )
 
     @app.get("/")
     def index():
@@ -49,5 +95,15 @@ def create_app() -> Flask:
     return app
 
 
-# Expose an app instance for `flask --app backend.app run`
-app = create_app()
+_app: "Flask | None" = None
+
+
+def __getattr__(name: str):
+    # `flask --app app run` discovers create_app(); `from app import app` still
+    # works but builds the instance only when it is first asked for.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,205 @@
+"""Admission control for heavy endpoints.
+
+Views opt in with ``@admitted("<class>")``. Each endpoint class (``ingest``,
+``report``, ``export``) has a concurrency limit per process. When the limit is
+reached, requests wait in a bounded queue for up to ``ADMISSION_TIMEOUT``
+seconds. Requests that arrive while the queue is full fail fast with ``429``,
+and requests whose wait times out get ``503``. Both carry ``Retry-After``, so
+a burst of uploads cannot take the DB pool, ``/health`` and light reads down
+with it.
+
+Streamed responses (exports) keep their slot until the body has been sent.
+Queue depth and wait times are exposed via ``stats()`` (``GET
+/api/admin/admission``).
+"""
+from __future__ import annotations
+
+import collections
+import functools
+import math
+import threading
+import time
+from typing import Callable
+
+from flask import jsonify, make_response
+
+from app.config import Settings
+
+# Wait-time samples kept per class for percentiles
+_SAMPLES = 1024
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Gate:
+    """Counting semaphore with a bounded wait queue and metrics."""
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._queued = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._max_waiting = 0
+        self._waits: collections.deque[float] = collections.deque(maxlen=_SAMPLES)
+        self._wait_max = 0.0
+        self._hold_avg = 0.0  # EWMA of seconds a slot is held, for Retry-After
+
+    def _retry_after(self) -> int:
+        # Rough time until a queued request would get a slot
+        rounds = (self._waiting + 1) / max(self.limit, 1)
+        return max(1, min(60, math.ceil(self._hold_avg * rounds)))
+
+    def acquire(self) -> float:
+        """Take a slot, waiting if needed. Returns seconds waited; raises :class:`Rejected`."""
+        started = time.perf_counter()
+        with self._cond:
+            if self._active < self.limit and self._waiting == 0:
+                self._active += 1
+                self._admitted += 1
+                self._waits.append(0.0)
+                return 0.0
+            if self._waiting >= self.queue_size:
+                self._rejected_full += 1
+                raise Rejected(429, "queue_full", self._retry_after())
+
+            self._waiting += 1
+            self._queued += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+            deadline = started + self.timeout
+            try:
+                while self._active >= self.limit:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._rejected_timeout += 1
+                        raise Rejected(503, "timeout", self._retry_after())
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._active += 1
+            self._admitted += 1
+            waited = time.perf_counter() - started
+            self._waits.append(waited)
+            self._wait_max = max(self._wait_max, waited)
+            return waited
+
+    def release(self, held: float) -> None:
+        with self._cond:
+            self._active -= 1
+            self._hold_avg = held if self._hold_avg == 0.0 else 0.8 * self._hold_avg + 0.2 * held
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "limit": self.limit,
+                "queue_size": self.queue_size,
+                "timeout_s": self.timeout,
+                "active": self._active,
+                "queue_depth": self._waiting,
+                "max_queue_depth": self._max_waiting,
+                "admitted": self._admitted,
+                "queued": self._queued,
+                "rejected_queue_full": self._rejected_full,
+                "rejected_timeout": self._rejected_timeout,
+                "wait_ms": {
+                    "p50": round(_percentile(waits, 0.50) * 1000, 1),
+                    "p95": round(_percentile(waits, 0.95) * 1000, 1),
+                    "max": round(self._wait_max * 1000, 1),
+                    "samples": len(waits),
+                },
+                "hold_ms_avg": round(self._hold_avg * 1000, 1),
+            }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+CLASSES = ("ingest", "report", "export")
+
+_gates: dict[str, Gate] | None = None
+_gates_lock = threading.Lock()
+
+
+def get_gates() -> dict[str, Gate]:
+    """Process-wide gates by class; classes with a limit of 0 are not gated."""
+    global _gates
+    if _gates is None:
+        with _gates_lock:
+            if _gates is None:
+                settings = Settings()
+                limits = {
+                    "ingest": settings.ADMISSION_INGEST,
+                    "report": settings.ADMISSION_REPORT,
+                    "export": settings.ADMISSION_EXPORT,
+                }
+                _gates = {
+                    name: Gate(name, limit, settings.ADMISSION_QUEUE, settings.ADMISSION_TIMEOUT)
+                    for name, limit in limits.items()
+                    if limit > 0
+                }
+    return _gates
+
+
+def stats() -> dict:
+    gates = get_gates()
+    return {name: gates[name].stats() if name in gates else None for name in CLASSES}
+
+
+def admitted(endpoint_class: str) -> Callable[[Callable], Callable]:
+    """Decorator: run the view only after a slot of ``endpoint_class`` is free."""
+    if endpoint_class not in CLASSES:
+        raise ValueError(f"unknown endpoint class: {endpoint_class}")
+
+    def decorate(view: Callable) -> Callable:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            gate = get_gates().get(endpoint_class)
+            if gate is None:
+                return view(*args, **kwargs)
+            try:
+                gate.acquire()
+            except Rejected as exc:
+                response = jsonify(
+                    {
+                        "error": "server busy, retry later",
+                        "status": exc.reason,
+                        "class": endpoint_class,
+                    }
+                )
+                response.status_code = exc.status
+                response.headers["Retry-After"] = str(exc.retry_after)
+                return response
+
+            started = time.perf_counter()
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                gate.release(time.perf_counter() - started)
+                raise
+            if response.is_streamed:
+                # Keep the slot until the server has finished sending the body
+                response.call_on_close(lambda: gate.release(time.perf_counter() - started))
+            else:
+                gate.release(time.perf_counter() - started)
+            return response
+
+        return wrapper
+
+    return decorate
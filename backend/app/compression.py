@@ -0,0 +1,132 @@
+"""Accept-Encoding negotiated response compression.
+
+Views opt in with ``@compressed``. Buffered bodies at or above
+``Settings.COMPRESS_MIN_SIZE`` are compressed in one go; streamed bodies
+(``Response(generator)``) are compressed chunk by chunk, flushing after each
+chunk so the client keeps receiving data while the export is produced.
+
+gzip is always available (zlib); zstd is offered when the optional
+``zstandard`` package is installed and preferred when the client accepts both.
+"""
+from __future__ import annotations
+
+import functools
+import zlib
+from typing import Callable, Iterable, Iterator
+
+from flask import current_app, make_response, request
+from flask.wrappers import Response
+
+try:  # optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+# Server preference order when the client weighs encodings equally
+SUPPORTED = ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+# zstd levels run 1..22; map the shared 1..9 setting onto a comparable range
+_ZSTD_LEVELS = {1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6, 7: 9, 8: 12, 9: 19}
+
+
+def negotiate(accept_encoding: str | None, supported: Iterable[str] = SUPPORTED) -> str | None:
+    """Pick the best of ``supported`` for an ``Accept-Encoding`` header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+    best, best_q = None, 0.0
+    for enc in supported:
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+def _zstd_level(level: int) -> int:
+    return _ZSTD_LEVELS.get(max(1, min(level, 9)), 6)
+
+
+def compress(data: bytes, encoding: str, level: int = 6) -> bytes:
+    if encoding == "gzip":
+        co = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+        return co.compress(data) + co.flush()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=_zstd_level(level)).compress(data)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return zlib.decompress(data, 31)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+
+def compress_stream(chunks: Iterable[bytes | str], encoding: str, level: int = 6) -> Iterator[bytes]:
+    """Incrementally compress ``chunks``; each input chunk is flushed to a block boundary."""
+    if encoding == "gzip":
+        co = zlib.compressobj(level, zlib.DEFLATED, 31)
+        sync, finish = zlib.Z_SYNC_FLUSH, zlib.Z_FINISH
+    else:
+        co = zstandard.ZstdCompressor(level=_zstd_level(level)).compressobj()
+        sync, finish = zstandard.COMPRESSOBJ_FLUSH_BLOCK, zstandard.COMPRESSOBJ_FLUSH_FINISH
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if not chunk:
+            continue
+        out = co.compress(chunk) + co.flush(sync)
+        if out:
+            yield out
+    yield co.flush(finish)
+
+
+def _add_vary(response: Response) -> None:
+    if "accept-encoding" not in {v.lower() for v in response.vary}:
+        response.vary.add("Accept-Encoding")
+
+
+def compress_response(response: Response) -> Response:
+    """Compress ``response`` in place according to the current request's Accept-Encoding."""
+    if response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+    _add_vary(response)
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+    level = current_app.config["COMPRESS_LEVEL"]
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < current_app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        response.set_data(compress(body, encoding, level))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def compressed(view: Callable) -> Callable:
+    """Decorator: negotiate compression for the view's response."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return compress_response(make_response(view(*args, **kwargs)))
+
+    return wrapper
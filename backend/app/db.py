@@ -1,5 +1,10 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 from .config import Settings
 
 
@@ -7,6 +12,39 @@ class Base(DeclarativeBase):
     pass
 
 
-_settings = Settings()
-engine = create_engine(_settings.DATABASE_URL, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# The engine is built on first use rather than at import so that importing
+# models (Alembic, scripts, worker boot) does not load the DB driver.
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+SessionLocal = sessionmaker(autoflush=False, autocommit=False, future=True)
+
+
+def _sqlite_foreign_keys(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(Settings().DATABASE_URL, future=True)
+                if _engine.dialect.name == "sqlite":
+                    # Honour ON DELETE CASCADE like Postgres does (local tooling)
+                    event.listen(_engine, "connect", _sqlite_foreign_keys)
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_session() -> Session:
+    get_engine()
+    return SessionLocal()
+
+
+def __getattr__(name: str):
+    # Backwards compatible `from app.db import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,106 @@
+"""In-process background jobs.
+
+Long-running maintenance work (bulk deletes, bulk renders) is submitted here
+and runs on a small thread pool outside the request. Clients poll
+``GET /api/jobs/<id>`` for status and progress. Jobs live in memory only:
+they are per-process and are lost on restart.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .config import Settings
+
+log = logging.getLogger(__name__)
+
+# Finished jobs kept for polling before the oldest are forgotten
+MAX_FINISHED = 200
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str = "queued"  # queued|running|done|failed
+    progress: dict = field(default_factory=dict)
+    result: Any = None
+    error: str | None = None
+    created_at: dt.datetime = field(default_factory=lambda: dt.datetime.now(dt.timezone.utc))
+    started_at: dt.datetime | None = None
+    finished_at: dt.datetime | None = None
+
+    def update(self, **progress: Any) -> None:
+        self.progress = {**self.progress, **progress}
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobRunner:
+    def __init__(self, workers: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        """Run ``fn(job, *args, **kwargs)`` in the background; its return value becomes ``job.result``."""
+        job = Job(id=uuid.uuid4().hex, kind=kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        job.status = "running"
+        job.started_at = dt.datetime.now(dt.timezone.utc)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = "done"
+        except Exception as exc:
+            log.exception("job %s (%s) failed", job.id, job.kind)
+            job.error = str(exc)
+            job.status = "failed"
+        finally:
+            job.finished_at = dt.datetime.now(dt.timezone.utc)
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.finished_at is not None]
+        if len(finished) <= MAX_FINISHED:
+            return
+        finished.sort(key=lambda j: j.finished_at)
+        for j in finished[: len(finished) - MAX_FINISHED]:
+            del self._jobs[j.id]
+
+
+_runner: JobRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner(workers=Settings().JOB_WORKERS)
+    return _runner
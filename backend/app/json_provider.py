@@ -0,0 +1,60 @@
+"""Pluggable JSON provider for the Flask app.
+
+``JSON_PROVIDER=auto`` (default) uses orjson when it is installed and falls
+back to Flask's stdlib provider otherwise; ``orjson`` / ``default`` force one.
+orjson serializes straight to bytes, which ``response()`` hands to the
+response object without an extra encode step.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:  # optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Key sorting costs time on large payloads and nothing relies on it
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # orjson only knows 2-space indentation and key sorting; anything else
+        # (other indents, separators, cls, ...) goes to the stdlib provider
+        # rather than being silently ignored
+        indent = kwargs.pop("indent", None)
+        sort_keys = kwargs.pop("sort_keys", self.sort_keys)
+        if kwargs or indent not in (None, 2):
+            if indent is not None:
+                kwargs["indent"] = indent
+            return super().dumps(obj, sort_keys=sort_keys, **kwargs)
+        return self._dumpb(obj, indent=indent == 2, sort_keys=sort_keys).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def _dumpb(self, obj: Any, indent: bool = False, sort_keys: bool | None = None) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        # Dates, Decimals etc. go through Flask's hook so output matches the default provider
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumpb(obj) + b"\n", mimetype=self.mimetype)
+
+
+def make_json_provider(app, name: str = "auto"):
+    if name == "default" or (name == "auto" and orjson is None):
+        return DefaultJSONProvider(app)
+    if orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson requires the orjson package")
+    return OrjsonProvider(app)
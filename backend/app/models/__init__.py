@@ -5,6 +5,8 @@ from .datasets import (
     BinomRumbleSpentData,
     BinomGoogleSpentData,
     RumbleCampaignData,
+    DatasetBatch,
+    DATASET_MODELS,
 )
 from .invoices import Invoice, InvoiceItem, InvoiceSequence
 
@@ -15,6 +17,8 @@ __all__ = [
     "BinomRumbleSpentData",
     "BinomGoogleSpentData",
     "RumbleCampaignData",
+    "DatasetBatch",
+    "DATASET_MODELS",
     "Invoice",
     "InvoiceItem",
     "InvoiceSequence",
@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime as dt
 from typing import Optional
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import JSON, Date, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -23,11 +23,15 @@ class Upload(Base):
 
 
 class _BaseDataset:
+    # On Postgres these tables are range-partitioned by month on date_from
+    # (see app.partitions); the physical primary key there is (id, date_from).
+    __partition_key__ = "date_from"
+
     id: Mapped[int] = mapped_column(primary_key=True)
     date_from: Mapped[dt.date] = mapped_column(Date, index=True)
     date_to: Mapped[dt.date] = mapped_column(Date, index=True)
     report_type: Mapped[str] = mapped_column(String(16), index=True)
-    upload_id: Mapped[int] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"))
+    upload_id: Mapped[int] = mapped_column(ForeignKey("uploads.id", ondelete="CASCADE"), index=True)
     created_at: Mapped[dt.datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -39,6 +43,9 @@ class GoogleData(_BaseDataset, Base):
     account_name: Mapped[Optional[str]] = mapped_column(String(255))
     campaign: Mapped[Optional[str]] = mapped_column(String(255), index=True)
     cost: Mapped[Optional[float]] = mapped_column(Numeric(14, 2))
+    # Join identity, filled at ingest (app.services.matching)
+    campaign_id: Mapped[Optional[str]] = mapped_column(String(32), index=True)
+    name_key: Mapped[Optional[str]] = mapped_column(String(255), index=True)
 
 
 class RumbleData(_BaseDataset, Base):
@@ -63,6 +70,9 @@ class BinomGoogleSpentData(_BaseDataset, Base):
     name: Mapped[Optional[str]] = mapped_column(String(255), index=True)
     leads: Mapped[Optional[int]] = mapped_column(Integer)
     revenue: Mapped[Optional[float]] = mapped_column(Numeric(14, 2))
+    # Join identity, filled at ingest (app.services.matching)
+    campaign_id: Mapped[Optional[str]] = mapped_column(String(32), index=True)
+    name_key: Mapped[Optional[str]] = mapped_column(String(255), index=True)
 
 
 class RumbleCampaignData(_BaseDataset, Base):
@@ -71,3 +81,40 @@ class RumbleCampaignData(_BaseDataset, Base):
     name: Mapped[Optional[str]] = mapped_column(String(255), index=True)
     cpm: Mapped[Optional[float]] = mapped_column(Numeric(14, 2))
     daily_limit: Mapped[Optional[float]] = mapped_column(Numeric(14, 2))
+
+
+class DatasetBatch(Base):
+    """Catalog of ingested batches, one row per (source, date_from, date_to, report_type).
+
+    Maintained in the same transactions that insert or delete dataset rows
+    (see app.services.catalog), so batch listings never aggregate the
+    dataset tables.
+    """
+
+    __tablename__ = "dataset_batches"
+    __table_args__ = (
+        UniqueConstraint("source", "date_from", "date_to", "report_type", name="uq_dataset_batches_key"),
+        Index("ix_dataset_batches_source_date", "source", "date_from", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    source: Mapped[str] = mapped_column(String(50))
+    date_from: Mapped[dt.date] = mapped_column(Date)
+    date_to: Mapped[dt.date] = mapped_column(Date)
+    report_type: Mapped[str] = mapped_column(String(16))
+    row_count: Mapped[int] = mapped_column(Integer, default=0)
+    spend_total: Mapped[float] = mapped_column(Numeric(16, 2), default=0)
+    revenue_total: Mapped[float] = mapped_column(Numeric(16, 2), default=0)
+    first_uploaded_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True))
+    last_uploaded_at: Mapped[Optional[dt.datetime]] = mapped_column(DateTime(timezone=True))
+    upload_ids: Mapped[list] = mapped_column(JSON, default=list)
+
+
+# API source slug -> dataset model
+DATASET_MODELS: dict[str, type[_BaseDataset]] = {
+    "google": GoogleData,
+    "rumble": RumbleData,
+    "binom-rumble": BinomRumbleSpentData,
+    "binom-google": BinomGoogleSpentData,
+    "rumble-campaign": RumbleCampaignData,
+}
@@ -3,7 +3,7 @@ from __future__ import annotations
 import datetime as dt
 from typing import Optional
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, Numeric, String, Text, UniqueConstraint, func
+from sqlalchemy import Date, DateTime, ForeignKey, Index, Integer, Numeric, String, Text, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -11,6 +11,8 @@ from app.db import Base
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    # Keyset pagination walks (invoice_date DESC, id DESC)
+    __table_args__ = (Index("ix_invoices_date_id", "invoice_date", "id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
@@ -21,8 +23,10 @@ class Invoice(Base):
     total: Mapped[float] = mapped_column(Numeric(14, 2), default=0)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
+    # Not eager by default: queries opt in with selectinload(Invoice.items).
+    # passive_deletes lets the FK's ON DELETE CASCADE remove items without loading them.
     items: Mapped[list["InvoiceItem"]] = relationship(
-        back_populates="invoice", cascade="all, delete-orphan"
+        back_populates="invoice", cascade="all, delete-orphan", passive_deletes=True
     )
 
 
@@ -0,0 +1,145 @@
+"""Monthly range partitions for the dataset tables.
+
+On Postgres the five dataset tables are ``PARTITION BY RANGE (date_from)``
+with one partition per calendar month (see migration ``20261019_090000``).
+Partitions are created on demand at ingest, and deleting a whole month
+becomes ``DETACH`` + ``DROP`` instead of a row-by-row ``DELETE``. On other
+databases (SQLite for local tooling) every helper here is a no-op and callers
+fall back to plain statements.
+"""
+from __future__ import annotations
+
+import datetime as dt
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .db import get_engine
+
+_partitioned: dict[str, bool] = {}
+
+
+def month_bounds(day: dt.date) -> tuple[dt.date, dt.date]:
+    start = day.replace(day=1)
+    end = (start + dt.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def partition_name(table: str, day: dt.date) -> str:
+    return f"{table}_p{day:%Y_%m}"
+
+
+def is_partitioned(table: str) -> bool:
+    cached = _partitioned.get(table)
+    if cached is not None:
+        return cached
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        result = False
+    else:
+        with engine.connect() as conn:
+            result = (
+                conn.execute(
+                    text(
+                        "SELECT 1 FROM pg_partitioned_table p "
+                        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+                    ),
+                    {"table": table},
+                ).first()
+                is not None
+            )
+    _partitioned[table] = result
+    return result
+
+
+def ensure_partition(table: str, day: dt.date) -> None:
+    """Create the monthly partition holding ``day`` if it does not exist yet.
+
+    Runs on its own short autocommitted connection: ``CREATE TABLE ... PARTITION
+    OF`` locks the parent, and holding that for the length of an upload would
+    block report reads. Existence is checked in the catalog on every call
+    rather than cached per process, since another worker may have dropped the
+    month since (``drop_month``); the lookup is one indexed read.
+    """
+    if not is_partitioned(table):
+        return
+    name = partition_name(table, day)
+    start, end = month_bounds(day)
+    with get_engine().connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar():
+            return
+        conn.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        )
+
+
+def _partition_exists(db: Session, name: str) -> bool:
+    return db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def drop_month(db: Session, table: str, day: dt.date) -> int | None:
+    """Detach and drop the partition holding ``day``.
+
+    Returns the number of rows removed, or ``None`` when the table is not
+    partitioned (the caller should fall back to ``DELETE``).
+    """
+    if not is_partitioned(table):
+        return None
+    name = partition_name(table, day)
+    if not _partition_exists(db, name):
+        return 0
+    # Writes wait from here on, so the count matches what is dropped
+    db.execute(text(f'LOCK TABLE "{name}" IN SHARE ROW EXCLUSIVE MODE'))
+    rows = db.execute(text(f'SELECT count(*) FROM "{name}"')).scalar() or 0
+    db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+    db.execute(text(f'DROP TABLE "{name}"'))
+    return rows
+
+
+def drop_if_whole_partition(
+    db: Session,
+    table: str,
+    date_from: dt.date,
+    date_to: dt.date | None = None,
+    report_type: str | None = None,
+) -> int | None:
+    """Drop the partition for ``date_from`` when the filter covers all its rows.
+
+    A month partition can hold several batches (weekly and monthly), so this
+    only takes the fast path when nothing else lives in it. The partition is
+    locked against writes before counting, so no other batch can commit rows
+    into it between the count and the drop. Returns the number of rows
+    removed, or ``None`` when the caller must ``DELETE`` instead (roll back
+    first to release the lock).
+    """
+    if not is_partitioned(table):
+        return None
+    name = partition_name(table, date_from)
+    if not _partition_exists(db, name):
+        return 0
+    # SHARE ROW EXCLUSIVE: blocks inserts/deletes, still allows reads, and
+    # conflicts with itself so two drops of one month cannot both proceed
+    db.execute(text(f'LOCK TABLE "{name}" IN SHARE ROW EXCLUSIVE MODE'))
+    conditions = ["date_from = :date_from"]
+    params: dict = {"date_from": date_from}
+    if date_to is not None:
+        conditions.append("date_to = :date_to")
+        params["date_to"] = date_to
+    if report_type is not None:
+        conditions.append("report_type = :report_type")
+        params["report_type"] = report_type
+    total, matched = db.execute(
+        text(
+            f'SELECT count(*), count(*) FILTER (WHERE {" AND ".join(conditions)}) FROM "{name}"'
+        ),
+        params,
+    ).one()
+    if total != matched:
+        return None
+    db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+    db.execute(text(f'DROP TABLE "{name}"'))
+    return matched
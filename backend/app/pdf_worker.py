@@ -0,0 +1,12 @@
+"""Process-pool entry point for PDF rendering.
+
+Kept free of Flask/SQLAlchemy imports so spawned workers start quickly and
+only load WeasyPrint.
+"""
+from __future__ import annotations
+
+
+def render_pdf(html: str) -> bytes:
+    from weasyprint import HTML
+
+    return HTML(string=html).write_pdf()
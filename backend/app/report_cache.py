@@ -0,0 +1,130 @@
+"""In-process cache of rendered report bodies, stored pre-compressed.
+
+Entries are keyed by the request's query and validated against a fingerprint
+of the catalog rows the report reads (see ``catalog.fingerprint``): any
+upload or delete touching those batches changes the fingerprint, so a stale
+entry is simply recomputed and replaced. Because the fingerprint lives in the
+database, every worker process stays correct without cross-process
+invalidation.
+
+Bodies are kept gzip-compressed (a zstd variant is added the first time a
+client asks for it), so repeat hits are served without recompressing. Bodies
+below ``COMPRESS_MIN_SIZE`` are kept as-is. The cache is bounded by
+``Settings.REPORT_CACHE_MB`` and evicts least-recently-used entries.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Hashable
+
+from .compression import compress, decompress
+
+
+@dataclass
+class _Entry:
+    fingerprint: Hashable
+    # encoding -> body; None is the identity (uncompressed) body
+    variants: dict[str | None, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return sum(len(v) for v in self.variants.values())
+
+
+class ReportCache:
+    def __init__(self, max_bytes: int, min_size: int = 1024, level: int = 6) -> None:
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fingerprint: Hashable, encoding: str | None) -> tuple[str | None, bytes] | None:
+        """Return ``(content_encoding, body)`` for a fresh entry, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.fingerprint != fingerprint:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if None in entry.variants:  # stored uncompressed (below the threshold)
+                return None, entry.variants[None]
+            if encoding in entry.variants:
+                return encoding, entry.variants[encoding]
+            stored = entry.variants["gzip"]
+
+        body = decompress(stored, "gzip")
+        if encoding is None:
+            return None, body
+        variant = compress(body, encoding, self.level)
+        with self._lock:
+            if self._entries.get(key) is entry:
+                entry.variants[encoding] = variant
+                self._size += len(variant)
+                self._evict()
+        return encoding, variant
+
+    def put(self, key: Hashable, fingerprint: Hashable, body: bytes, encoding: str | None) -> tuple[str | None, bytes]:
+        """Store ``body`` and return it as ``(content_encoding, body)`` for ``encoding``."""
+        entry = _Entry(fingerprint)
+        if len(body) < self.min_size:
+            entry.variants[None] = body
+            result = (None, body)
+        else:
+            entry.variants["gzip"] = compress(body, "gzip", self.level)
+            if encoding not in (None, "gzip"):
+                entry.variants[encoding] = compress(body, encoding, self.level)
+            result = (encoding, entry.variants[encoding]) if encoding else (None, body)
+
+        if entry.size > self.max_bytes:
+            return result
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old.size
+            self._entries[key] = entry
+            self._size += entry.size
+            self._evict()
+        return result
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and self._entries:
+            _key, victim = self._entries.popitem(last=False)
+            self._size -= victim.size
+
+
+_report_cache: ReportCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_report_cache(max_bytes: int, min_size: int = 1024, level: int = 6) -> ReportCache | None:
+    """Process-wide cache; None when disabled (``REPORT_CACHE_MB=0``)."""
+    global _report_cache
+    if max_bytes <= 0:
+        return None
+    if _report_cache is None:
+        with _cache_lock:
+            if _report_cache is None:
+                _report_cache = ReportCache(max_bytes, min_size, level)
+    return _report_cache
@@ -0,0 +1,106 @@
+import datetime as dt
+
+from flask import Blueprint, jsonify, request, g, url_for
+
+from app import admission
+from app.db import get_session
+from app.jobs import get_job_runner
+from app.services.reports import report_periods
+from app.services.snapshots import get_snapshot_store
+from app.slowlog import get_slow_query_log
+
+bp = Blueprint("admin", __name__)
+
+
+@bp.get("/admin/slow-queries")
+def list_slow_queries():
+    # Query params: limit (default 20), order_by=total_ms|max_ms|calls
+    slow_log = get_slow_query_log()
+    if slow_log is None:
+        return jsonify({"enabled": False, "statements": []})
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 200))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    order_by = request.args.get("order_by", "total_ms")
+    return jsonify(
+        {
+            "enabled": True,
+            "threshold_ms": slow_log.threshold_ms,
+            "statements": slow_log.top(limit=limit, order_by=order_by),
+        }
+    )
+
+
+@bp.delete("/admin/slow-queries")
+def reset_slow_queries():
+    slow_log = get_slow_query_log()
+    if slow_log is not None:
+        slow_log.reset()
+    return jsonify({"status": "reset"})
+
+
+@bp.get("/admin/admission")
+def admission_stats():
+    # Per endpoint class: limit, active, queue_depth, rejections and wait_ms
+    # percentiles (this process only); null for classes that are not gated
+    return jsonify({"classes": admission.stats()})
+
+
+@bp.get("/admin/snapshots")
+def list_snapshots():
+    store = get_snapshot_store()
+    if store is None:
+        return jsonify({"enabled": False, "snapshots": []})
+    return jsonify(
+        {
+            "enabled": True,
+            "root": store.root,
+            "closed_after_days": store.closed_after_days,
+            "snapshots": store.list(),
+        }
+    )
+
+
+@bp.post("/admin/snapshots")
+def build_snapshots():
+    # Body or query: report_type, date_from, date_to. Builds every closed period in the range as a job.
+    store = get_snapshot_store()
+    if store is None:
+        return jsonify({"error": "snapshots are disabled (SNAPSHOTS=0 or numpy not installed)"}), 501
+    payload = request.get_json(silent=True) or {}
+    report_type = payload.get("report_type") or request.args.get("report_type", "weekly")
+    try:
+        date_from = dt.date.fromisoformat(payload.get("date_from") or request.args.get("date_from"))
+        date_to = dt.date.fromisoformat(payload.get("date_to") or request.args.get("date_to"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "date_from and date_to (YYYY-MM-DD) are required"}), 400
+
+    periods = [p for p in report_periods(g.db, report_type, date_from, date_to) if store.is_closed(p[1])]
+    job = get_job_runner().submit(
+        f"snapshots:{report_type}:{date_from}_{date_to}", _build_snapshots_job, report_type, periods
+    )
+    return (
+        jsonify({"status": "accepted", "job_id": job.id, "periods": len(periods)}),
+        202,
+        {"Location": url_for("jobs.get_job", job_id=job.id)},
+    )
+
+
+def _build_snapshots_job(job, report_type: str, periods: list[tuple]) -> dict:
+    store = get_snapshot_store()
+    built = []
+    job.update(total=len(periods), built=0)
+    with get_session() as db:
+        for date_from, date_to in periods:
+            built.append(store.build(db, report_type, date_from, date_to))
+            db.rollback()  # end the read transaction between periods
+            job.update(built=len(built))
+    return {"built": built}
+
+
+@bp.delete("/admin/snapshots")
+def delete_snapshots():
+    store = get_snapshot_store()
+    removed = store.invalidate() if store is not None else 0
+    return jsonify({"status": "deleted", "removed": removed})
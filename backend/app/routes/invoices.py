@@ -1,42 +1,207 @@
-from flask import Blueprint, jsonify, request
+from __future__ import annotations
+
+import datetime as dt
+
+from flask import Blueprint, current_app, jsonify, request, g, send_file, url_for
+from sqlalchemy import extract, select
+from sqlalchemy.orm import selectinload
+
+from app.admission import admitted
+from app.db import get_session
+from app.jobs import get_job_runner
+from app.models import Invoice
+from app.services import billing
+from app.services import invoices as invoice_service
+from app.services import pdf as pdf_service
 
 bp = Blueprint("invoices", __name__)
 
 
+def _parse_date(value: str | None) -> dt.date | None:
+    return dt.date.fromisoformat(value) if value else None
+
+
 @bp.get("/invoices")
 def list_invoices():
-    # NOTE: Stub – return empty list
-    return jsonify({"items": [], "total": 0})
+    # Query params: limit (default 50, max 200), cursor (from next_cursor),
+    # date_from/date_to (YYYY-MM-DD, on invoice_date), bill_to (substring), include=items
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        date_from = _parse_date(request.args.get("date_from"))
+        date_to = _parse_date(request.args.get("date_to"))
+    except ValueError:
+        return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
+    try:
+        rows, next_cursor, total = invoice_service.list_invoices(
+            g.db,
+            limit=limit,
+            cursor=request.args.get("cursor"),
+            date_from=date_from,
+            date_to=date_to,
+            bill_to=request.args.get("bill_to"),
+            include_items=request.args.get("include") == "items",
+        )
+    except invoice_service.InvoiceError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"items": rows, "total": total, "next_cursor": next_cursor})
 
 
 @bp.post("/invoices")
 def create_invoice():
     payload = request.get_json(silent=True) or {}
-    # NOTE: Stub – would validate and persist
-    return jsonify({"id": 1, **payload}), 201
+    try:
+        invoice = invoice_service.create_invoice(
+            g.db, payload, number_block=current_app.config["INVOICE_NUMBER_BLOCK"]
+        )
+    except invoice_service.InvoiceError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(invoice_service.invoice_to_dict(invoice)), 201
+
+
+@bp.post("/invoices/from-report")
+@admitted("report")
+def create_invoices_from_report():
+    # Body: name, report_type, date_from, date_to, group_by=campaign|account,
+    # amount=revenue|spend|pl, invoice_date (default date_to), notes, dry_run
+    payload = request.get_json(silent=True) or {}
+    name = (payload.get("name") or "").strip()
+    if not name:
+        return jsonify({"error": "name is required"}), 400
+    if not (payload.get("date_from") and payload.get("date_to")):
+        return jsonify({"error": "date_from and date_to are required"}), 400
+    try:
+        date_from = _parse_date(payload["date_from"])
+        date_to = _parse_date(payload["date_to"])
+        invoice_date = _parse_date(payload.get("invoice_date"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
+
+    dry_run = bool(payload.get("dry_run"))
+    try:
+        created = billing.create_invoices_from_report(
+            g.db,
+            name=name[:255],
+            report_type=payload.get("report_type", "weekly"),
+            date_from=date_from,
+            date_to=date_to,
+            group_by=payload.get("group_by", "campaign"),
+            amount=payload.get("amount", "revenue"),
+            invoice_date=invoice_date,
+            notes=payload.get("notes"),
+            dry_run=dry_run,
+        )
+    except invoice_service.InvoiceError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return (
+        jsonify(
+            {
+                "status": "dry_run" if dry_run else "created",
+                "count": len(created),
+                "total": round(sum(i["total"] for i in created), 2),
+                "invoices": created,
+            }
+        ),
+        200 if dry_run else 201,
+    )
 
 
 @bp.get("/invoices/<int:invoice_id>")
 def get_invoice(invoice_id: int):
-    # NOTE: Stub – not found placeholder
-    return jsonify({"id": invoice_id, "items": [], "total": 0}), 200
+    invoice = invoice_service.get_invoice(g.db, invoice_id)
+    if invoice is None:
+        return jsonify({"error": "invoice not found"}), 404
+    return jsonify(invoice_service.invoice_to_dict(invoice)), 200
 
 
 @bp.put("/invoices/<int:invoice_id>")
 @bp.patch("/invoices/<int:invoice_id>")
 def update_invoice(invoice_id: int):
     payload = request.get_json(silent=True) or {}
-    # NOTE: Stub – would validate and update
-    return jsonify({"id": invoice_id, **payload}), 200
+    db = g.db
+    invoice = invoice_service.get_invoice(db, invoice_id)
+    if invoice is None:
+        return jsonify({"error": "invoice not found"}), 404
+    try:
+        invoice_service.update_invoice(invoice, payload)
+    except invoice_service.InvoiceError as exc:
+        return jsonify({"error": str(exc)}), 400
+    db.flush()
+    pdf_service.invalidate(invoice_id)
+    return jsonify(invoice_service.invoice_to_dict(invoice)), 200
 
 
 @bp.delete("/invoices/<int:invoice_id>")
 def delete_invoice(invoice_id: int):
-    # NOTE: Stub – would delete
+    db = g.db
+    invoice = db.get(Invoice, invoice_id)
+    if invoice is None:
+        return jsonify({"error": "invoice not found"}), 404
+    db.delete(invoice)
+    pdf_service.invalidate(invoice_id)
     return jsonify({"status": "deleted", "id": invoice_id}), 200
 
 
 @bp.get("/invoices/<int:invoice_id>/pdf")
 def get_invoice_pdf(invoice_id: int):
-    # NOTE: Stub – will stream PDF later
-    return jsonify({"status": "not_implemented", "id": invoice_id}), 501
+    invoice = invoice_service.get_invoice(g.db, invoice_id)
+    if invoice is None:
+        return jsonify({"error": "invoice not found"}), 404
+    try:
+        path = pdf_service.ensure_pdf(invoice)
+    except pdf_service.PdfUnavailable as exc:
+        return jsonify({"error": str(exc), "status": "not_implemented", "id": invoice_id}), 501
+    except pdf_service.PdfRenderTimeout as exc:
+        # The render keeps going in the pool and is cached when done; retry then
+        return (
+            jsonify({"error": str(exc), "status": "rendering", "id": invoice_id}),
+            503,
+            {"Retry-After": "5"},
+        )
+    # send_file streams from disk; conditional=True enables ETag/Range handling
+    return send_file(
+        path,
+        mimetype="application/pdf",
+        as_attachment=True,
+        download_name=pdf_service.download_name(invoice),
+        conditional=True,
+    )
+
+
+def _render_month_job(job, year: int, month: int) -> dict:
+    with get_session() as db:
+        invoices = list(
+            db.execute(
+                select(Invoice)
+                .where(extract("year", Invoice.invoice_date) == year, extract("month", Invoice.invoice_date) == month)
+                .options(selectinload(Invoice.items))
+                .order_by(Invoice.id)
+            ).scalars()
+        )
+        return pdf_service.render_many(invoices, progress=job.update)
+
+
+@bp.post("/invoices/pdf/render-month")
+def render_month_pdfs():
+    # Body or query: year=YYYY, month=1..12. Renders (and caches) every PDF for that month.
+    payload = request.get_json(silent=True) or {}
+    try:
+        year = int(payload.get("year") or request.args.get("year"))
+        month = int(payload.get("month") or request.args.get("month"))
+        if not 1 <= month <= 12:
+            raise ValueError
+    except (TypeError, ValueError):
+        return jsonify({"error": "year and month (1-12) are required"}), 400
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        return jsonify({"error": "PDF rendering requires WeasyPrint (pip install WeasyPrint)"}), 501
+
+    job = get_job_runner().submit(f"render-pdfs:{year}-{month:02d}", _render_month_job, year, month)
+    return (
+        jsonify({"status": "accepted", "job_id": job.id}),
+        202,
+        {"Location": url_for("jobs.get_job", job_id=job.id)},
+    )
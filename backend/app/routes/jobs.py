@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+
+from app.jobs import get_job_runner
+
+bp = Blueprint("jobs", __name__)
+
+
+@bp.get("/jobs/<job_id>")
+def get_job(job_id: str):
+    job = get_job_runner().get(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job.to_dict())
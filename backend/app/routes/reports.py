@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import csv
 import datetime as dt
-import re
-from collections import defaultdict
-from typing import Dict, Tuple
-
-from flask import Blueprint, jsonify, request, g
-from sqlalchemy import select, func
-
-from app.models import GoogleData, BinomGoogleSpentData
+import io
+
+from flask import Blueprint, current_app, jsonify, request, g
+
+from app.admission import admitted
+from app.compression import compressed, negotiate
+from app.report_cache import get_report_cache
+from app.services.catalog import fingerprint
+from app.services.reports import (
+    REPORT_COLUMNS,
+    google_binom_rows,
+    google_binom_trend,
+    match_diagnostics,
+    rows_payload,
+)
 
 bp = Blueprint("reports", __name__)
 
@@ -17,21 +25,20 @@ def _parse_date(value: str) -> dt.date:
     return dt.date.fromisoformat(value)
 
 
-def _norm(s: str | None) -> str:
-    if not s:
-        return ""
-    s = s.lower().strip()
-    # remove non-alnum
-    return re.sub(r"[^a-z0-9]", "", s)
+# Rows per chunk of a streamed CSV export
+EXPORT_CHUNK_ROWS = 1000
 
 
 @bp.get("/reports/google-binom")
+@admitted("report")
+@compressed
 def google_binom_report():
     # Query params: report_type=weekly|monthly, date_from=YYYY-MM-DD, date_to=YYYY-MM-DD
     report_type = request.args.get("report_type", "weekly")
     date_from_s = request.args.get("date_from")
     date_to_s = request.args.get("date_to")
     roi_last_mode = request.args.get("roi_last_mode", "full")  # full|cohort
+    shape = request.args.get("shape", "rows")  # rows|columns
 
     if not (date_from_s and date_to_s):
         return jsonify({"error": "date_from and date_to are required"}), 400
@@ -42,127 +49,160 @@ def google_binom_report():
     except Exception:
         return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
 
-    db = g.db
+    shape = shape if shape == "columns" else "rows"
 
-    # Aggregate Google spend by campaign
-    g_stmt = (
-        select(
-            GoogleData.campaign,
-            func.sum(GoogleData.cost).label("spend"),
-        )
-        .where(
-            GoogleData.date_from == date_from,
-            GoogleData.date_to == date_to,
-            GoogleData.report_type == report_type,
+    def build():
+        rows, summary = google_binom_rows(g.db, report_type, date_from, date_to)
+        # Optional: could add account_summaries if account data is present
+        return jsonify(
+            {
+                "report": "google-binom",
+                "report_type": report_type,
+                "date_from": str(date_from),
+                "date_to": str(date_to),
+                "roi_last_mode": roi_last_mode,
+                "shape": shape,
+                "rows": rows_payload(rows, shape),
+                "account_summaries": [],
+                "summary": summary,
+            }
         )
-        .group_by(GoogleData.campaign)
+
+    cache = get_report_cache(
+        current_app.config["REPORT_CACHE_MB"] * 1024 * 1024,
+        current_app.config["COMPRESS_MIN_SIZE"],
+        current_app.config["COMPRESS_LEVEL"],
     )
+    if cache is None:
+        return build()
+
+    # The fingerprint is read before the report, so a concurrent write can
+    # only make the cached body newer than its stamp, never older.
+    key = ("google-binom", report_type, date_from, date_to, roi_last_mode, shape)
+    stamp = fingerprint(g.db, ("google", "binom-google"), date_from, date_to, report_type)
+    encoding = negotiate(request.headers.get("Accept-Encoding"))
+    cached = cache.get(key, stamp, encoding)
+    status = "hit"
+    if cached is None:
+        cached = cache.put(key, stamp, build().get_data(), encoding)
+        status = "miss"
+
+    content_encoding, body = cached
+    response = current_app.response_class(body, mimetype="application/json")
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    response.vary.add("Accept-Encoding")
+    response.headers["X-Report-Cache"] = status
+    return response
+
+
+@bp.get("/reports/google-binom/export")
+@admitted("export")
+@compressed
+def google_binom_export():
+    # Streamed CSV of the report rows; same query params as the JSON report
+    report_type = request.args.get("report_type", "weekly")
+    date_from_s = request.args.get("date_from")
+    date_to_s = request.args.get("date_to")
+    if not (date_from_s and date_to_s):
+        return jsonify({"error": "date_from and date_to are required"}), 400
+    try:
+        date_from = _parse_date(date_from_s)
+        date_to = _parse_date(date_to_s)
+    except Exception:
+        return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
 
-    # Aggregate Binom revenue/leads by name
-    b_stmt = (
-        select(
-            BinomGoogleSpentData.name,
-            func.sum(BinomGoogleSpentData.revenue).label("revenue"),
-            func.sum(BinomGoogleSpentData.leads).label("leads"),
-        )
-        .where(
-            BinomGoogleSpentData.date_from == date_from,
-            BinomGoogleSpentData.date_to == date_to,
-            BinomGoogleSpentData.report_type == report_type,
-        )
-        .group_by(BinomGoogleSpentData.name)
+    rows, _summary = google_binom_rows(g.db, report_type, date_from, date_to)
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(REPORT_COLUMNS)
+        for start in range(0, len(rows), EXPORT_CHUNK_ROWS):
+            writer.writerows(
+                [r.campaign, r.name, r.spend, r.revenue, r.pl, r.roi, r.leads]
+                for r in rows[start : start + EXPORT_CHUNK_ROWS]
+            )
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+    filename = f"google-binom-{report_type}-{date_from}_{date_to}.csv"
+    return current_app.response_class(
+        generate(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
-    google_rows = list(db.execute(g_stmt))
-    binom_rows = list(db.execute(b_stmt))
-
-    # Build maps by normalized key
-    g_map: Dict[str, Tuple[str, float]] = {}
-    for campaign, spend in google_rows:
-        key = _norm(campaign)
-        if not key:
-            continue
-        g_map[key] = (campaign or "", float(spend or 0))
-
-    b_map: Dict[str, Tuple[str, float, int]] = {}
-    for name, revenue, leads in binom_rows:
-        key = _norm(name)
-        if not key:
-            continue
-        b_map[key] = (name or "", float(revenue or 0), int(leads or 0))
-
-    # Join
-    seen = set()
-    rows = []
-    total_spend = 0.0
-    total_revenue = 0.0
-    for key, (campaign, spend) in g_map.items():
-        name = campaign
-        revenue = 0.0
-        leads = 0
-        if key in b_map:
-            _bname, brevenue, bleads = b_map[key]
-            revenue = brevenue
-            leads = bleads
-            name = _bname or campaign
-            seen.add(key)
-        pl = (revenue - spend)
-        roi = (revenue / spend * 100.0) if spend and revenue else (0.0 if spend else None)
-        rows.append(
-            {
-                "campaign": campaign,
-                "name": name,
-                "spend": round(spend, 2),
-                "revenue": round(revenue, 2),
-                "pl": round(pl, 2),
-                "roi": (round(roi, 2) if roi is not None else None),
-                "leads": leads,
-            }
-        )
-        total_spend += spend or 0.0
-        total_revenue += revenue or 0.0
-
-    # Include Binom-only rows to preserve totals
-    for key, (bname, brevenue, bleads) in b_map.items():
-        if key in seen:
-            continue
-        rows.append(
-            {
-                "campaign": None,
-                "name": bname,
-                "spend": 0.0,
-                "revenue": round(brevenue or 0.0, 2),
-                "pl": round((brevenue or 0.0), 2),
-                "roi": None,
-                "leads": bleads or 0,
-            }
-        )
-        total_revenue += brevenue or 0.0
 
-    summary = {
-        "spend": round(total_spend, 2),
-        "revenue": round(total_revenue, 2),
-        "pl": round(total_revenue - total_spend, 2),
-        "roi": (round((total_revenue / total_spend * 100.0), 2) if total_spend else None),
-        "roi_last": None,  # computed when prior period is implemented
-    }
+@bp.get("/reports/google-binom/trend")
+@admitted("report")
+@compressed
+def google_binom_trend_report():
+    # Query params: report_type, date_from, date_to (range of periods), top=N campaign series (default 0, max 100)
+    report_type = request.args.get("report_type", "weekly")
+    date_from_s = request.args.get("date_from")
+    date_to_s = request.args.get("date_to")
+    if not (date_from_s and date_to_s):
+        return jsonify({"error": "date_from and date_to are required"}), 400
+    try:
+        date_from = _parse_date(date_from_s)
+        date_to = _parse_date(date_to_s)
+    except Exception:
+        return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
+    try:
+        top = max(0, min(int(request.args.get("top", 0)), 100))
+    except ValueError:
+        return jsonify({"error": "top must be an integer"}), 400
+
+    trend = google_binom_trend(g.db, report_type, date_from, date_to, top=top)
+    return jsonify(
+        {
+            "report": "google-binom-trend",
+            "report_type": report_type,
+            "date_from": str(date_from),
+            "date_to": str(date_to),
+            **trend,
+        }
+    )
 
-    # Optional: could add account_summaries if account data is present
+
+@bp.get("/reports/google-binom/diagnostics")
+@admitted("report")
+@compressed
+def google_binom_diagnostics():
+    # Query params: report_type, date_from, date_to, limit (per list, default 100, max 1000)
+    report_type = request.args.get("report_type", "weekly")
+    date_from_s = request.args.get("date_from")
+    date_to_s = request.args.get("date_to")
+    if not (date_from_s and date_to_s):
+        return jsonify({"error": "date_from and date_to are required"}), 400
+    try:
+        date_from = _parse_date(date_from_s)
+        date_to = _parse_date(date_to_s)
+    except Exception:
+        return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    diagnostics = match_diagnostics(g.db, report_type, date_from, date_to, limit=limit)
     return jsonify(
         {
             "report": "google-binom",
             "report_type": report_type,
             "date_from": str(date_from),
             "date_to": str(date_to),
-            "roi_last_mode": roi_last_mode,
-            "rows": rows,
-            "account_summaries": [],
-            "summary": summary,
+            **diagnostics,
         }
     )
 
 
 @bp.get("/reports/rumble-binom")
+@compressed
 def rumble_binom_report():
     # Still a stub for Phase 3
     report_type = request.args.get("report_type", "weekly")
@@ -2,18 +2,31 @@ from __future__ import annotations
 
 import csv
 import datetime as dt
+import itertools
 from io import TextIOWrapper
 import re
 from typing import Iterable
 
-from flask import Blueprint, jsonify, request, g
+from flask import Blueprint, current_app, jsonify, request, g, url_for
 from sqlalchemy import select, func, delete
 
 from app.models import (
     Upload,
     GoogleData,
     BinomGoogleSpentData,
+    DatasetBatch,
+    DATASET_MODELS,
 )
+from app.admission import admitted
+from app.compression import compressed
+from app.db import get_session
+from app.jobs import get_job_runner
+from app.partitions import drop_if_whole_partition, drop_month, ensure_partition, is_partitioned, month_bounds
+from app.services.catalog import MEASURES, batch_to_dict, forget_batches, forget_upload, lock_batches, record_ingest
+from app.services.deletes import count_rows, delete_in_batches
+from app.services.matching import identity
+from app.services.replace import replace_batch
+from app.services.snapshots import get_snapshot_store
 
 bp = Blueprint("uploads", __name__)
 
@@ -132,8 +145,92 @@ def _parse_int(val: str | None) -> int | None:
         return None
 
 
+def _google_rows(f) -> Iterable[dict]:
+    """Parsed ``google_data`` columns for each usable row of a Google Ads CSV."""
+    for row in _iter_csv(f):
+        # Try multiple header variants
+        account = (
+            row.get("account")
+            or row.get("account_name")
+            or row.get("account_descriptive_name")
+        )
+        campaign = row.get("campaign") or row.get("campaign_name")
+        if not campaign:
+            for k in row.keys():
+                if "campaign" in k:
+                    campaign = row.get(k)
+                    break
+        # Cost may appear as cost_(usd) or similar
+        cost_s = row.get("cost")
+        if cost_s is None:
+            for k in row.keys():
+                if "cost" in k:
+                    cost_s = row.get(k)
+                    break
+        if not campaign:
+            continue
+        campaign_id, name_key = identity(campaign)
+        yield {
+            "account_name": account,
+            "campaign": campaign,
+            "cost": _parse_float(cost_s),
+            "campaign_id": campaign_id,
+            "name_key": name_key,
+        }
+
+
+def _binom_google_rows(f) -> Iterable[dict]:
+    """Parsed ``binom_google_spent_data`` columns for each usable row of a Binom export."""
+    # Binom exports typically use semicolon with quotes
+    for row in _iter_csv(f, delimiter=";"):
+        name = row.get("name")
+        if not name:
+            continue
+        revenue = _parse_float(row.get("revenue"))
+        # Skip rows with non-positive revenue to match behavior
+        if revenue is not None and revenue <= 0:
+            continue
+        campaign_id, name_key = identity(name)
+        yield {
+            "name": name,
+            "leads": _parse_int(row.get("leads")),
+            "revenue": revenue,
+            "campaign_id": campaign_id,
+            "name_key": name_key,
+        }
+
+
+# source -> (row parser, model) for the sources ingested so far
+PARSERS = {
+    "google": (_google_rows, GoogleData),
+    "binom-google": (_binom_google_rows, BinomGoogleSpentData),
+}
+UPLOAD_MODES = ("append", "replace")
+
+
+def _no_rows(source: str):
+    # Provide a helpful error explaining likely header mismatch
+    return (
+        jsonify(
+            {
+                "error": "no rows inserted; check CSV headers match expected fields",
+                "expected": {
+                    "google": ["campaign", "cost"],
+                    "binom-google": ["name", "revenue"],
+                }.get(source, []),
+                "status": "no_rows",
+                "source": source,
+            }
+        ),
+        400,
+    )
+
+
 @bp.post("/uploads/<source>")
+@admitted("ingest")
 def upload_source(source: str):
+    # Form/query param: mode=append (default) adds the file's rows to the batch;
+    # mode=replace swaps the batch's rows for the file's in one transaction
     table = _validate_source(source)
     if not table:
         return jsonify({"error": "invalid source"}), 400
@@ -142,6 +239,7 @@ def upload_source(source: str):
     date_from_s = request.form.get("date_from")
     date_to_s = request.form.get("date_to")
     report_type = request.form.get("report_type", "weekly")
+    mode = request.form.get("mode") or request.args.get("mode", "append")
     if not (date_from_s and date_to_s):
         return jsonify({"error": "date_from and date_to are required"}), 400
     try:
@@ -149,11 +247,48 @@ def upload_source(source: str):
         date_to = _parse_date(date_to_s)
     except Exception:
         return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
+    if mode not in UPLOAD_MODES:
+        return jsonify({"error": f"mode must be one of: {', '.join(UPLOAD_MODES)}"}), 400
 
     f = request.files.get("file")
     if not f:
         return jsonify({"error": "file is required (multipart/form-data)"}), 400
 
+    if source not in PARSERS:
+        # Other sources to be implemented in Phase 3
+        return jsonify({"status": "accepted", "source": source, "inserted": 0}), 202
+    parse, model = PARSERS[source]
+
+    if mode == "replace":
+        result = replace_batch(source, parse(f), date_from, date_to, report_type, f.filename or "upload.csv")
+        if result["inserted"] == 0:
+            return _no_rows(source)
+        store = get_snapshot_store()
+        if store is not None:
+            store.invalidate(report_type, date_from, date_to)
+        return jsonify(
+            {
+                "status": "ok",
+                "source": source,
+                "mode": mode,
+                **result,
+                "date_from": str(date_from),
+                "date_to": str(date_to),
+                "report_type": report_type,
+            }
+        )
+
+    rows = parse(f)
+    first = next(rows, None)
+    if first is None:
+        return _no_rows(source)
+
+    # The month's partition must exist before this request's transaction
+    # writes anything: CREATE ... PARTITION OF (own autocommit connection)
+    # needs a lock on `uploads` that our flushed Upload row would hold.
+    # Only done once a usable row is known, so bad files leave no partition.
+    ensure_partition(table, date_from)
+
     db = g.db
     now = dt.datetime.now(dt.timezone.utc)
 
@@ -168,93 +303,45 @@ def upload_source(source: str):
     db.flush()  # allocate upload.id
 
     inserted = 0
-    # Google CSV ingestion
-    if source == "google":
-        for row in _iter_csv(f):
-            # Try multiple header variants
-            account = (
-                row.get("account")
-                or row.get("account_name")
-                or row.get("account_descriptive_name")
-            )
-            campaign = row.get("campaign") or row.get("campaign_name")
-            if not campaign:
-                for k in row.keys():
-                    if "campaign" in k:
-                        campaign = row.get(k)
-                        break
-            # Cost may appear as cost_(usd) or similar
-            cost_s = row.get("cost")
-            if cost_s is None:
-                for k in row.keys():
-                    if "cost" in k:
-                        cost_s = row.get(k)
-                        break
-            if not campaign:
-                continue
-            cost = _parse_float(cost_s)
-            db.add(
-                GoogleData(
-                    account_name=account,
-                    campaign=campaign,
-                    cost=cost,
-                    date_from=date_from,
-                    date_to=date_to,
-                    report_type=report_type,
-                    upload_id=upload.id,
-                )
-            )
-            inserted += 1
-    elif source == "binom-google":
-        # Binom exports typically use semicolon with quotes
-        for row in _iter_csv(f, delimiter=";"):
-            name = row.get("name")
-            leads_s = row.get("leads")
-            revenue_s = row.get("revenue")
-            if not name:
-                continue
-            leads = _parse_int(leads_s)
-            revenue = _parse_float(revenue_s)
-            # Skip rows with non-positive revenue to match behavior
-            if revenue is not None and revenue <= 0:
-                continue
-            db.add(
-                BinomGoogleSpentData(
-                    name=name,
-                    leads=leads,
-                    revenue=revenue,
-                    date_from=date_from,
-                    date_to=date_to,
-                    report_type=report_type,
-                    upload_id=upload.id,
-                )
+    spend_total = 0.0
+    revenue_total = 0.0
+    spend_col, revenue_col = MEASURES[source]
+    for values in itertools.chain([first], rows):
+        db.add(
+            model(
+                **values,
+                date_from=date_from,
+                date_to=date_to,
+                report_type=report_type,
+                upload_id=upload.id,
             )
-            inserted += 1
-    else:
-        # Other sources to be implemented in Phase 3
-        return jsonify({"status": "accepted", "source": source, "inserted": 0}), 202
-
-    if inserted == 0:
-        # Provide a helpful error explaining likely header mismatch
-        return (
-            jsonify(
-                {
-                    "error": "no rows inserted; check CSV headers match expected fields",
-                    "expected": {
-                        "google": ["campaign", "cost"],
-                        "binom-google": ["name", "revenue"],
-                    }.get(source, []),
-                    "status": "no_rows",
-                    "source": source,
-                }
-            ),
-            400,
         )
+        if spend_col:
+            spend_total += values[spend_col] or 0.0
+        if revenue_col:
+            revenue_total += values[revenue_col] or 0.0
+        inserted += 1
+
+    # Locks the catalog row while the data rows above are still pending (no
+    # autoflush); they are written at commit, i.e. catalog row -> data rows
+    record_ingest(
+        db,
+        source,
+        date_from,
+        date_to,
+        report_type,
+        upload_id=upload.id,
+        uploaded_at=now,
+        rows=inserted,
+        spend=spend_total,
+        revenue=revenue_total,
+    )
 
     return jsonify(
         {
             "status": "ok",
             "source": source,
+            "mode": mode,
             "upload_id": upload.id,
             "inserted": inserted,
             "date_from": str(date_from),
@@ -265,98 +352,166 @@ def upload_source(source: str):
 
 
 @bp.get("/<source>/batches")
+@compressed
 def list_batches(source: str):
+    # Query params: limit (default 20, max 200), offset (default 0)
     table = _validate_source(source)
     if not table:
         return jsonify({"error": "invalid source"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 200))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
 
     db = g.db
-    if source == "google":
-        stmt = (
-            select(
-                GoogleData.date_from,
-                GoogleData.date_to,
-                GoogleData.report_type,
-                func.count().label("row_count"),
-            )
-            .group_by(GoogleData.date_from, GoogleData.date_to, GoogleData.report_type)
-            .order_by(GoogleData.date_from.desc())
-            .limit(20)
-        )
-        rows = [
-            {
-                "date_from": str(r.date_from),
-                "date_to": str(r.date_to),
-                "report_type": r.report_type,
-                "count": r.row_count,
-            }
-            for r in db.execute(stmt)
-        ]
-    elif source == "binom-google":
-        stmt = (
-            select(
-                BinomGoogleSpentData.date_from,
-                BinomGoogleSpentData.date_to,
-                BinomGoogleSpentData.report_type,
-                func.count().label("row_count"),
-            )
-            .group_by(
-                BinomGoogleSpentData.date_from,
-                BinomGoogleSpentData.date_to,
-                BinomGoogleSpentData.report_type,
-            )
-            .order_by(BinomGoogleSpentData.date_from.desc())
-            .limit(20)
-        )
-        rows = [
-            {
-                "date_from": str(r.date_from),
-                "date_to": str(r.date_to),
-                "report_type": r.report_type,
-                "count": r.row_count,
-            }
-            for r in db.execute(stmt)
-        ]
-    else:
-        # Future sources
-        rows = []
+    stmt = (
+        select(DatasetBatch)
+        .where(DatasetBatch.source == source)
+        .order_by(DatasetBatch.date_from.desc(), DatasetBatch.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    rows = [batch_to_dict(b) for b in db.execute(stmt).scalars()]
+    total = db.execute(
+        select(func.count()).select_from(DatasetBatch).where(DatasetBatch.source == source)
+    ).scalar()
 
-    return jsonify({"source": source, "batches": rows})
+    return jsonify({"source": source, "batches": rows, "total": total, "limit": limit, "offset": offset})
 
 
 @bp.delete("/<source>")
 def delete_source_data(source: str):
-    table = _validate_source(source)
-    if not table:
+    model = DATASET_MODELS.get(source)
+    if model is None:
         return jsonify({"error": "invalid source"}), 400
     report_type = request.args.get("report_type")
-    date_from = request.args.get("date_from")
-    date_to = request.args.get("date_to")
+    date_from_s = request.args.get("date_from")
+    date_to_s = request.args.get("date_to")
+    try:
+        date_from = _parse_date(date_from_s) if date_from_s else None
+        date_to = _parse_date(date_to_s) if date_to_s else None
+    except Exception:
+        return jsonify({"error": "invalid date format, use YYYY-MM-DD"}), 400
 
     db = g.db
+    table = model.__tablename__
+
+    # Fast path: the batch is the only thing in its month partition
+    if date_from is not None and is_partitioned(table):
+        batch_where = [
+            DatasetBatch.date_from == date_from,
+            *([DatasetBatch.date_to == date_to] if date_to is not None else []),
+            *([DatasetBatch.report_type == report_type] if report_type else []),
+        ]
+        # Catalog rows, then the partition: the order of every write path
+        # (see app.services.catalog)
+        lock_batches(db, source, *batch_where)
+        dropped = drop_if_whole_partition(db, table, date_from, date_to, report_type)
+        if dropped is not None:
+            forget_batches(db, source, *batch_where)
+            return jsonify({"status": "deleted", "rows": dropped, "strategy": "partition_drop"})
+        # Release the catalog and partition locks: the batched deletes below run
+        # in their own transactions and lock these rows again
+        db.rollback()
+
     where = []
+    if date_from is not None:
+        where.append(model.date_from == date_from)
+    if date_to is not None:
+        where.append(model.date_to == date_to)
     if report_type:
-        # applied per model below
-        pass
-    if source == "google":
-        stmt = delete(GoogleData)
-        if date_from:
-            stmt = stmt.where(GoogleData.date_from == _parse_date(date_from))
-        if date_to:
-            stmt = stmt.where(GoogleData.date_to == _parse_date(date_to))
-        if report_type:
-            stmt = stmt.where(GoogleData.report_type == report_type)
-        res = db.execute(stmt)
-    elif source == "binom-google":
-        stmt = delete(BinomGoogleSpentData)
-        if date_from:
-            stmt = stmt.where(BinomGoogleSpentData.date_from == _parse_date(date_from))
-        if date_to:
-            stmt = stmt.where(BinomGoogleSpentData.date_to == _parse_date(date_to))
-        if report_type:
-            stmt = stmt.where(BinomGoogleSpentData.report_type == report_type)
-        res = db.execute(stmt)
-    else:
-        return jsonify({"status": "no_op", "source": source}), 200
-
-    return jsonify({"status": "deleted", "rows": getattr(res, "rowcount", None)})
+        where.append(model.report_type == report_type)
+    return _run_batched_delete(f"delete:{source}", [(source, where)])
+
+
+def _wants_async() -> bool:
+    return request.args.get("async", "").lower() in {"1", "true", "yes"}
+
+
+def _batched_delete_job(job, targets: list, batch_size: int) -> dict:
+    """Job body: delete each (source, where) target in batches, reporting progress."""
+    total = sum(count_rows(DATASET_MODELS[source], where) for source, where in targets)
+    job.update(estimated_total=total, deleted=0)
+    deleted = 0
+    for source, where in targets:
+        done_before = deleted
+        deleted += delete_in_batches(
+            source,
+            where,
+            batch_size,
+            progress=lambda n, base=done_before: job.update(deleted=base + n),
+        )
+    return {"rows": deleted}
+
+
+def _run_batched_delete(kind: str, targets: list, finalize=None):
+    """Delete targets in bounded batches, inline or (with ?async=1) as a background job."""
+    batch_size = current_app.config["DELETE_BATCH_SIZE"]
+
+    def body(job):
+        result = _batched_delete_job(job, targets, batch_size)
+        if finalize is not None:
+            finalize()
+        return result
+
+    if _wants_async():
+        job = get_job_runner().submit(kind, body)
+        return (
+            jsonify({"status": "accepted", "job_id": job.id, "strategy": "batched_delete"}),
+            202,
+            {"Location": url_for("jobs.get_job", job_id=job.id)},
+        )
+
+    rows = 0
+    for source, where in targets:
+        rows += delete_in_batches(source, where, batch_size)
+    if finalize is not None:
+        finalize()
+    return jsonify({"status": "deleted", "rows": rows, "strategy": "batched_delete"})
+
+
+@bp.delete("/<source>/periods/<period>")
+def delete_source_period(source: str, period: str):
+    # Deletes every batch whose date_from falls in the month (period=YYYY-MM)
+    model = DATASET_MODELS.get(source)
+    if model is None:
+        return jsonify({"error": "invalid source"}), 400
+    try:
+        month = dt.datetime.strptime(period, "%Y-%m").date()
+    except ValueError:
+        return jsonify({"error": "invalid period, use YYYY-MM"}), 400
+
+    db = g.db
+    start, end = month_bounds(month)
+    if is_partitioned(model.__tablename__):
+        batch_where = [DatasetBatch.date_from >= start, DatasetBatch.date_from < end]
+        # Catalog rows, then the partition: the order of every write path
+        # (see app.services.catalog)
+        lock_batches(db, source, *batch_where)
+        dropped = drop_month(db, model.__tablename__, month)
+        forget_batches(db, source, *batch_where)
+        return jsonify({"status": "deleted", "period": period, "rows": dropped, "strategy": "partition_drop"})
+
+    where = [model.date_from >= start, model.date_from < end]
+    return _run_batched_delete(f"delete:{source}:{period}", [(source, where)])
+
+
+@bp.delete("/uploads/<int:upload_id>")
+def delete_upload(upload_id: int):
+    # Removes an upload and every dataset row it produced (indexed on upload_id)
+    db = g.db
+    upload = db.get(Upload, upload_id)
+    if upload is None:
+        return jsonify({"error": "upload not found"}), 404
+
+    sources = [upload.source_type] if upload.source_type in DATASET_MODELS else list(DATASET_MODELS)
+    targets = [(src, [DATASET_MODELS[src].upload_id == upload_id]) for src in sources]
+
+    def finalize():
+        with get_session() as s, s.begin():
+            for src in sources:
+                forget_upload(s, src, upload_id)
+            s.execute(delete(Upload).where(Upload.id == upload_id))
+
+    return _run_batched_delete(f"delete-upload:{upload_id}", targets, finalize=finalize)
@@ -0,0 +1,108 @@
+"""Bulk invoice generation from report results.
+
+Turns one Google–Binom report period into invoices in a single transaction:
+one ``UPDATE ... RETURNING`` reserves every invoice number, and invoices and
+items go in as two multi-row ``INSERT`` statements.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models import Invoice, InvoiceItem
+from app.services.invoices import CENT, InvoiceError
+from app.services.numbering import allocate, format_invoice_number
+from app.services.reports import google_accounts, google_binom_rows
+
+GROUPINGS = {"campaign", "account"}
+AMOUNTS = {"spend", "revenue", "pl"}
+UNKNOWN_ACCOUNT = "Unassigned"
+
+
+def plan_invoices(
+    db: Session,
+    report_type: str,
+    date_from: dt.date,
+    date_to: dt.date,
+    group_by: str = "campaign",
+    amount: str = "revenue",
+) -> list[dict]:
+    """Group report rows into ``[{"bill_to": ..., "items": [...]}]``; rows with amount <= 0 are skipped."""
+    if group_by not in GROUPINGS:
+        raise InvoiceError(f"group_by must be one of {sorted(GROUPINGS)}")
+    if amount not in AMOUNTS:
+        raise InvoiceError(f"amount must be one of {sorted(AMOUNTS)}")
+
+    rows, _summary = google_binom_rows(db, report_type, date_from, date_to)
+    accounts = google_accounts(db, report_type, date_from, date_to) if group_by == "account" else {}
+    period = f"{date_from.isoformat()} to {date_to.isoformat()}"
+
+    groups: dict[str, list[dict]] = defaultdict(list)
+    for row in rows:
+        value = Decimal(str(getattr(row, amount) or 0)).quantize(CENT)
+        if value <= 0:
+            continue
+        label = row.campaign or row.name
+        key = label if group_by == "campaign" else accounts.get(row.campaign, UNKNOWN_ACCOUNT)
+        groups[key].append(
+            {"item": f"{label} ({period})"[:255], "quantity": Decimal("1.00"), "rate": value, "amount": value}
+        )
+    return [{"bill_to": key, "items": items} for key, items in sorted(groups.items())]
+
+
+def create_invoices_from_report(
+    db: Session,
+    name: str,
+    report_type: str,
+    date_from: dt.date,
+    date_to: dt.date,
+    group_by: str = "campaign",
+    amount: str = "revenue",
+    invoice_date: dt.date | None = None,
+    notes: str | None = None,
+    dry_run: bool = False,
+) -> list[dict]:
+    """Create one invoice per group for the period; returns a summary per invoice."""
+    invoice_date = invoice_date or date_to
+    plan = plan_invoices(db, report_type, date_from, date_to, group_by=group_by, amount=amount)
+    for entry in plan:
+        entry["total"] = sum((i["amount"] for i in entry["items"]), Decimal("0"))
+    if dry_run or not plan:
+        return [
+            {"bill_to": e["bill_to"], "items": len(e["items"]), "total": float(e["total"])} for e in plan
+        ]
+
+    year = invoice_date.year
+    numbers = [format_invoice_number(year, seq) for seq in allocate(db, year, len(plan))]
+    invoice_ids = db.scalars(
+        insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True),
+        [
+            {
+                "name": name,
+                "bill_to": entry["bill_to"],
+                "invoice_date": invoice_date,
+                "invoice_number": number,
+                "notes": notes,
+                "total": entry["total"],
+            }
+            for entry, number in zip(plan, numbers)
+        ],
+    ).all()
+    db.execute(
+        insert(InvoiceItem),
+        [{"invoice_id": invoice_id, **item} for invoice_id, entry in zip(invoice_ids, plan) for item in entry["items"]],
+    )
+    return [
+        {
+            "id": invoice_id,
+            "invoice_number": number,
+            "bill_to": entry["bill_to"],
+            "items": len(entry["items"]),
+            "total": float(entry["total"]),
+        }
+        for invoice_id, number, entry in zip(invoice_ids, numbers, plan)
+    ]
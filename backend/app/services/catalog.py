@@ -0,0 +1,235 @@
+"""Batch catalog maintenance.
+
+``dataset_batches`` holds one row per (source, date_from, date_to,
+report_type) with row counts, spend/revenue totals, upload times and upload
+ids. Every write path updates it inside its own transaction:
+
+- ingest calls :func:`record_ingest` with the totals it just inserted;
+- batched deletes call :func:`apply_deleted` with the rows each batch removed
+  (``DELETE ... RETURNING``);
+- partition drops call :func:`forget_batches` for the batches they removed;
+- replace uploads lock the row with :func:`lock_batch` before swapping the
+  data and then overwrite it with :func:`record_replace`.
+
+Because of that, :func:`fingerprint` of a period changes whenever its data
+does, which is what the report cache validates against.
+
+Lock order is the same on every path: catalog rows first (in ``id`` order
+when there are several), then data rows or partitions, so a replace and a
+concurrent delete or ingest of the same period queue on the catalog row
+instead of deadlocking. Replace and deletes lock explicitly
+(:func:`lock_batch`, :func:`lock_batches`) before their DML. Ingest gets the
+same order because sessions do not autoflush: :func:`record_ingest` locks the
+row while the new data rows are still pending, and they are only written at
+commit. Ingest code must not flush data rows before calling it.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.models import DATASET_MODELS, DatasetBatch
+
+# source -> (spend column, revenue column) on its dataset model
+MEASURES: dict[str, tuple[str | None, str | None]] = {
+    "google": ("cost", None),
+    "rumble": ("spend", None),
+    "binom-rumble": (None, "revenue"),
+    "binom-google": (None, "revenue"),
+    "rumble-campaign": (None, None),
+}
+
+_KEY = ("source", "date_from", "date_to", "report_type")
+
+
+def _money(value) -> Decimal:
+    if value is None:
+        return Decimal("0")
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(round(float(value), 2)))
+
+
+def _aware(value: dt.datetime | None) -> dt.datetime | None:
+    # SQLite hands back naive datetimes even for timezone=True columns
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=dt.timezone.utc)
+    return value
+
+
+def measure_columns(source: str) -> list:
+    """Columns to RETURN from deletes so the catalog totals can be adjusted."""
+    model = DATASET_MODELS[source]
+    spend_col, revenue_col = MEASURES[source]
+    cols = [model.date_from, model.date_to, model.report_type]
+    cols.append(getattr(model, spend_col) if spend_col else None)
+    cols.append(getattr(model, revenue_col) if revenue_col else None)
+    return [c for c in cols if c is not None]
+
+
+def _lock_batch(db: Session, source: str, date_from: dt.date, date_to: dt.date, report_type: str) -> DatasetBatch:
+    """Get-or-create the catalog row and lock it for the rest of the transaction."""
+    values = {"source": source, "date_from": date_from, "date_to": date_to, "report_type": report_type}
+    dialect = db.get_bind().dialect.name
+    if dialect in {"postgresql", "sqlite"}:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.execute(
+            insert(DatasetBatch)
+            .values(row_count=0, spend_total=0, revenue_total=0, upload_ids=[], **values)
+            .on_conflict_do_nothing(index_elements=list(_KEY))
+        )
+    batch = db.execute(
+        select(DatasetBatch).filter_by(**values).with_for_update()
+    ).scalar_one_or_none()
+    if batch is None:
+        batch = DatasetBatch(row_count=0, spend_total=0, revenue_total=0, upload_ids=[], **values)
+        db.add(batch)
+        db.flush()
+    return batch
+
+
+def lock_batch(db: Session, source: str, date_from: dt.date, date_to: dt.date, report_type: str) -> DatasetBatch:
+    """Lock (creating if needed) the catalog row; serializes concurrent replaces of one batch."""
+    return _lock_batch(db, source, date_from, date_to, report_type)
+
+
+def lock_batches(db: Session, source: str, *where) -> list[DatasetBatch]:
+    """Lock the catalog rows of ``source`` matching ``where``, in id order."""
+    return list(
+        db.execute(
+            select(DatasetBatch)
+            .where(DatasetBatch.source == source, *where)
+            .order_by(DatasetBatch.id)
+            .with_for_update()
+        ).scalars()
+    )
+
+
+def record_replace(
+    batch: DatasetBatch, upload_id: int, uploaded_at: dt.datetime, rows: int, spend: float = 0.0, revenue: float = 0.0
+) -> DatasetBatch:
+    """The batch now holds exactly one upload's rows."""
+    batch.row_count = rows
+    batch.spend_total = _money(spend)
+    batch.revenue_total = _money(revenue)
+    batch.first_uploaded_at = uploaded_at
+    batch.last_uploaded_at = uploaded_at
+    batch.upload_ids = [upload_id]
+    return batch
+
+
+def record_ingest(
+    db: Session,
+    source: str,
+    date_from: dt.date,
+    date_to: dt.date,
+    report_type: str,
+    upload_id: int,
+    uploaded_at: dt.datetime,
+    rows: int,
+    spend: float = 0.0,
+    revenue: float = 0.0,
+) -> DatasetBatch:
+    batch = _lock_batch(db, source, date_from, date_to, report_type)
+    batch.row_count = (batch.row_count or 0) + rows
+    batch.spend_total = _money(batch.spend_total) + _money(spend)
+    batch.revenue_total = _money(batch.revenue_total) + _money(revenue)
+    if batch.first_uploaded_at is None or uploaded_at < _aware(batch.first_uploaded_at):
+        batch.first_uploaded_at = uploaded_at
+    if batch.last_uploaded_at is None or uploaded_at > _aware(batch.last_uploaded_at):
+        batch.last_uploaded_at = uploaded_at
+    if upload_id not in (batch.upload_ids or []):
+        batch.upload_ids = [*(batch.upload_ids or []), upload_id]
+    return batch
+
+
+def apply_deleted(db: Session, source: str, deleted_rows: Iterable) -> None:
+    """Subtract rows returned by ``DELETE ... RETURNING measure_columns(source)``."""
+    spend_col, revenue_col = MEASURES[source]
+    totals: dict[tuple, list] = defaultdict(lambda: [0, Decimal("0"), Decimal("0")])
+    for row in deleted_rows:
+        acc = totals[(row[0], row[1], row[2])]
+        acc[0] += 1
+        idx = 3
+        if spend_col:
+            acc[1] += _money(row[idx])
+            idx += 1
+        if revenue_col:
+            acc[2] += _money(row[idx])
+
+    for (date_from, date_to, report_type), (n, spend, revenue) in totals.items():
+        batch = db.execute(
+            select(DatasetBatch)
+            .filter_by(source=source, date_from=date_from, date_to=date_to, report_type=report_type)
+            .with_for_update()
+        ).scalar_one_or_none()
+        if batch is None:
+            continue
+        batch.row_count = (batch.row_count or 0) - n
+        if batch.row_count <= 0:
+            db.delete(batch)
+            continue
+        batch.spend_total = _money(batch.spend_total) - spend
+        batch.revenue_total = _money(batch.revenue_total) - revenue
+
+
+def forget_upload(db: Session, source: str, upload_id: int) -> None:
+    """Drop ``upload_id`` from the catalog rows of ``source`` once its rows are gone."""
+    for batch in lock_batches(db, source):
+        if upload_id in (batch.upload_ids or []):
+            batch.upload_ids = [u for u in batch.upload_ids if u != upload_id]
+
+
+def forget_batches(db: Session, source: str, *where) -> int:
+    """Remove catalog rows of ``source`` matching ``where`` (used after partition drops)."""
+    res = db.execute(delete(DatasetBatch).where(DatasetBatch.source == source, *where))
+    return res.rowcount or 0
+
+
+def fingerprint(
+    db: Session, sources: Iterable[str], date_from: dt.date, date_to: dt.date, report_type: str
+) -> tuple:
+    """Cheap version stamp for one period across ``sources`` (a unique-key lookup per source)."""
+    stmt = (
+        select(
+            DatasetBatch.source,
+            DatasetBatch.row_count,
+            DatasetBatch.spend_total,
+            DatasetBatch.revenue_total,
+            DatasetBatch.last_uploaded_at,
+            DatasetBatch.upload_ids,
+        )
+        .where(
+            DatasetBatch.source.in_(list(sources)),
+            DatasetBatch.date_from == date_from,
+            DatasetBatch.date_to == date_to,
+            DatasetBatch.report_type == report_type,
+        )
+        .order_by(DatasetBatch.source)
+    )
+    return tuple(
+        (source, rows, str(spend), str(revenue), str(uploaded_at), tuple(upload_ids or ()))
+        for source, rows, spend, revenue, uploaded_at, upload_ids in db.execute(stmt)
+    )
+
+
+def batch_to_dict(batch: DatasetBatch) -> dict:
+    return {
+        "date_from": str(batch.date_from),
+        "date_to": str(batch.date_to),
+        "report_type": batch.report_type,
+        "count": batch.row_count,
+        "spend_total": float(batch.spend_total or 0),
+        "revenue_total": float(batch.revenue_total or 0),
+        "first_uploaded_at": batch.first_uploaded_at.isoformat() if batch.first_uploaded_at else None,
+        "last_uploaded_at": batch.last_uploaded_at.isoformat() if batch.last_uploaded_at else None,
+        "upload_ids": batch.upload_ids or [],
+    }
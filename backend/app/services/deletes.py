@@ -0,0 +1,65 @@
+"""Bounded, lock-friendly deletes for dataset tables.
+
+Instead of one unbounded ``DELETE`` (one long transaction holding row locks
+and producing a burst of dead tuples), rows are removed ``batch_size`` at a
+time, each batch in its own short transaction. Readers are never blocked for
+longer than one batch, and autovacuum can keep up between batches.
+
+Each batch locks the catalog rows it is about to change before deleting data
+rows, the same order replace uploads use (see :mod:`app.services.catalog`).
+"""
+from __future__ import annotations
+
+from typing import Callable
+
+from sqlalchemy import delete, func, select, tuple_
+
+from app.db import get_session
+from app.models import DATASET_MODELS, DatasetBatch
+from app.services import catalog
+
+
+def count_rows(model, where: list) -> int:
+    with get_session() as db:
+        return db.execute(select(func.count()).select_from(model).where(*where)).scalar() or 0
+
+
+def delete_in_batches(
+    source: str,
+    where: list,
+    batch_size: int,
+    progress: Callable[[int], None] | None = None,
+) -> int:
+    """Delete rows of ``source`` matching ``where`` in committed batches; returns rows deleted.
+
+    Each batch adjusts the batch catalog in the same transaction as the delete.
+    """
+    model = DATASET_MODELS[source]
+    deleted = 0
+    while True:
+        with get_session() as db, db.begin():
+            picked = db.execute(
+                select(model.id, model.date_from, model.date_to, model.report_type).where(*where).limit(batch_size)
+            ).all()
+            if not picked:
+                return deleted
+            catalog.lock_batches(
+                db,
+                source,
+                tuple_(DatasetBatch.date_from, DatasetBatch.date_to, DatasetBatch.report_type).in_(
+                    sorted({(p.date_from, p.date_to, p.report_type) for p in picked})
+                ),
+            )
+            # Rows removed meanwhile (e.g. by a replace) are simply not returned
+            rows = db.execute(
+                delete(model)
+                .where(model.id.in_([p.id for p in picked]), *where)
+                .returning(*catalog.measure_columns(source))
+                .execution_options(synchronize_session=False)
+            ).all()
+            catalog.apply_deleted(db, source, rows)
+        deleted += len(rows)
+        if progress is not None:
+            progress(deleted)
+        if len(picked) < batch_size:
+            return deleted
@@ -0,0 +1,202 @@
+"""Invoice validation, creation and serialization."""
+from __future__ import annotations
+
+import datetime as dt
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from app.models import Invoice, InvoiceItem
+from app.services.numbering import next_invoice_numbers
+
+CENT = Decimal("0.01")
+
+
+class InvoiceError(ValueError):
+    """Invalid invoice payload; routes turn this into HTTP 400."""
+
+
+def _decimal(value, field: str, default: str | None = None) -> Decimal:
+    if value is None or value == "":
+        if default is None:
+            raise InvoiceError(f"{field} is required")
+        value = default
+    try:
+        return Decimal(str(value)).quantize(CENT)
+    except (InvalidOperation, ValueError):
+        raise InvoiceError(f"{field} must be a number") from None
+
+
+def parse_invoice_payload(payload: dict, partial: bool = False) -> dict:
+    """Validate a create/update body; with ``partial`` only the given fields are returned."""
+    data: dict = {}
+    if "name" in payload or not partial:
+        name = (payload.get("name") or "").strip()
+        if not name:
+            raise InvoiceError("name is required")
+        data["name"] = name[:255]
+    if "invoice_date" in payload or not partial:
+        raw = payload.get("invoice_date") or dt.date.today().isoformat()
+        try:
+            data["invoice_date"] = dt.date.fromisoformat(raw)
+        except (TypeError, ValueError):
+            raise InvoiceError("invalid invoice_date, use YYYY-MM-DD") from None
+    for key in ("bill_to", "notes"):
+        if key in payload or not partial:
+            data[key] = payload.get(key)
+    if "items" in payload or not partial:
+        items = payload.get("items") or []
+        if not isinstance(items, list):
+            raise InvoiceError("items must be a list")
+        parsed = []
+        for i, raw in enumerate(items):
+            if not isinstance(raw, dict) or not (raw.get("item") or "").strip():
+                raise InvoiceError(f"items[{i}].item is required")
+            quantity = _decimal(raw.get("quantity"), f"items[{i}].quantity", default="1")
+            rate = _decimal(raw.get("rate"), f"items[{i}].rate", default="0")
+            parsed.append(
+                {
+                    "item": raw["item"].strip()[:255],
+                    "quantity": quantity,
+                    "rate": rate,
+                    "amount": (quantity * rate).quantize(CENT),
+                }
+            )
+        data["items"] = parsed
+    return data
+
+
+def create_invoice(db: Session, payload: dict, number_block: int = 0) -> Invoice:
+    data = parse_invoice_payload(payload)
+    items = data.pop("items")
+    # Allocate last-minute so the counter row is locked as briefly as possible
+    (number,) = next_invoice_numbers(db, data["invoice_date"].year, 1, block_size=number_block)
+    invoice = Invoice(
+        **data,
+        invoice_number=number,
+        total=sum((i["amount"] for i in items), Decimal("0")),
+        items=[InvoiceItem(**i) for i in items],
+    )
+    db.add(invoice)
+    db.flush()
+    return invoice
+
+
+def update_invoice(invoice: Invoice, payload: dict) -> Invoice:
+    """Apply a partial update; ``items``, when given, replaces the whole item list."""
+    data = parse_invoice_payload(payload, partial=True)
+    items = data.pop("items", None)
+    for key, value in data.items():
+        setattr(invoice, key, value)
+    if items is not None:
+        invoice.items = [InvoiceItem(**i) for i in items]
+        invoice.total = sum((i["amount"] for i in items), Decimal("0"))
+    return invoice
+
+
+def encode_cursor(invoice_date: dt.date, invoice_id: int) -> str:
+    return f"{invoice_date.isoformat()}~{invoice_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[dt.date, int]:
+    try:
+        date_s, id_s = cursor.split("~", 1)
+        return dt.date.fromisoformat(date_s), int(id_s)
+    except ValueError:
+        raise InvoiceError("invalid cursor") from None
+
+
+def _like_escape(value: str) -> str:
+    """Escape LIKE wildcards so user text matches literally (use with ``escape="\\"``)."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def list_invoices(
+    db: Session,
+    limit: int = 50,
+    cursor: str | None = None,
+    date_from: dt.date | None = None,
+    date_to: dt.date | None = None,
+    bill_to: str | None = None,
+    include_items: bool = False,
+) -> tuple[list[dict], str | None, int]:
+    """One page of invoices, newest first, with SQL-computed item counts and totals.
+
+    Costs a fixed number of queries regardless of page size: the page, the
+    filtered count, and (with ``include_items``) one batched item load.
+    Returns ``(rows, next_cursor, total)``.
+    """
+    filters = []
+    if date_from is not None:
+        filters.append(Invoice.invoice_date >= date_from)
+    if date_to is not None:
+        filters.append(Invoice.invoice_date <= date_to)
+    if bill_to:
+        filters.append(Invoice.bill_to.ilike(f"%{_like_escape(bill_to)}%", escape="\\"))
+
+    # Correlated per-row aggregates hit ix_invoice_items_invoice_id for just this page
+    item_count = (
+        select(func.count(InvoiceItem.id)).where(InvoiceItem.invoice_id == Invoice.id).scalar_subquery()
+    )
+    items_total = (
+        select(func.coalesce(func.sum(InvoiceItem.amount), 0))
+        .where(InvoiceItem.invoice_id == Invoice.id)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(Invoice, item_count.label("item_count"), items_total.label("items_total"))
+        .where(*filters)
+        .order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(tuple_(Invoice.invoice_date, Invoice.id) < tuple_(*decode_cursor(cursor)))
+    if include_items:
+        stmt = stmt.options(selectinload(Invoice.items))
+
+    page = db.execute(stmt).all()
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last = page[-1][0]
+        next_cursor = encode_cursor(last.invoice_date, last.id)
+
+    rows = []
+    for invoice, count, total in page:
+        data = invoice_to_dict(invoice, include_items=include_items)
+        data["item_count"] = count
+        data["items_total"] = float(total or 0)
+        rows.append(data)
+
+    total = db.execute(select(func.count()).select_from(Invoice).where(*filters)).scalar()
+    return rows, next_cursor, total
+
+
+def get_invoice(db: Session, invoice_id: int) -> Invoice | None:
+    return db.get(Invoice, invoice_id, options=[selectinload(Invoice.items)])
+
+
+def item_to_dict(item: InvoiceItem) -> dict:
+    return {
+        "id": item.id,
+        "item": item.item,
+        "quantity": float(item.quantity or 0),
+        "rate": float(item.rate or 0),
+        "amount": float(item.amount or 0),
+    }
+
+
+def invoice_to_dict(invoice: Invoice, include_items: bool = True) -> dict:
+    data = {
+        "id": invoice.id,
+        "name": invoice.name,
+        "bill_to": invoice.bill_to,
+        "invoice_date": str(invoice.invoice_date),
+        "invoice_number": invoice.invoice_number,
+        "notes": invoice.notes,
+        "total": float(invoice.total or 0),
+    }
+    if include_items:
+        data["items"] = [item_to_dict(i) for i in invoice.items]
+    return data
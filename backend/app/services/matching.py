@@ -0,0 +1,50 @@
+"""Campaign identity for the Google–Binom join.
+
+Strict 1:1 matching (PLAN.md): rows match on the campaign ID when one is
+present, otherwise on the exact sanitized name. Both are extracted once at
+ingest into the indexed ``campaign_id`` / ``name_key`` columns of
+``google_data`` and ``binom_google_spent_data``, so reports join on plain
+strings with no per-request regex work.
+
+A campaign ID is the ``YYMMDD_NN`` token our campaign names carry (e.g.
+``DG - US - 250920_01 - Angle6 - 1-1``). The Google campaign name and the
+Binom name embed the same token, so it is extracted the same way on both
+sides.
+"""
+from __future__ import annotations
+
+import re
+
+CAMPAIGN_ID_RE = re.compile(r"(?<!\d)(\d{6}_\d{1,4})(?!\d)")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]")
+
+
+def extract_campaign_id(name: str | None) -> str | None:
+    if not name:
+        return None
+    m = CAMPAIGN_ID_RE.search(name)
+    return m.group(1) if m else None
+
+
+def sanitize_key(name: str | None) -> str:
+    """Lowercase alphanumerics only; ``""`` when nothing is left."""
+    if not name:
+        return ""
+    return _NON_ALNUM_RE.sub("", name.lower())
+
+
+def identity(name: str | None) -> tuple[str | None, str]:
+    """``(campaign_id, name_key)`` stored alongside a campaign/name at ingest."""
+    return extract_campaign_id(name), sanitize_key(name)
+
+
+def join_key(campaign_id: str | None, name_key: str | None) -> str:
+    """Join key of a stored row: the ID when present, else the sanitized name.
+
+    Prefixed so an ID never equals a name key; ``""`` means the row cannot match.
+    """
+    if campaign_id:
+        return f"id:{campaign_id}"
+    if name_key:
+        return f"name:{name_key}"
+    return ""
@@ -0,0 +1,151 @@
+"""Invoice number allocation on ``invoice_sequences``.
+
+Numbers are ``INV-YYYY-NNN``, one counter row per year. Two modes:
+
+- :func:`allocate` bumps the counter with a single atomic
+  ``UPDATE ... SET seq = seq + n RETURNING seq`` inside the caller's
+  transaction. The row lock is held until that transaction ends, so numbers
+  are gapless (a rollback gives them back) and there is no read-modify-write
+  window to deadlock on. Concurrent creators queue on the row for the length
+  of their (short) transaction.
+- :class:`BlockAllocator` reserves a block of numbers in its own tiny
+  committed transaction and hands them out from memory, so bulk runs and
+  busy workers only touch the counter row once per block. Unused numbers are
+  returned on :meth:`BlockAllocator.release` when nothing was allocated after
+  them; otherwise they become gaps, which :func:`find_gaps` reports.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.db import get_session
+from app.models import Invoice, InvoiceSequence
+
+log = logging.getLogger(__name__)
+
+NUMBER_PREFIX = "INV"
+
+
+def format_invoice_number(year: int, seq: int) -> str:
+    return f"{NUMBER_PREFIX}-{year}-{seq:03d}"
+
+
+def _ensure_year(db: Session, year: int) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # pragma: no cover - only Postgres and SQLite are supported
+        if db.get(InvoiceSequence, year) is None:
+            db.add(InvoiceSequence(year=year, seq=0))
+            db.flush()
+        return
+    db.execute(insert(InvoiceSequence).values(year=year, seq=0).on_conflict_do_nothing(index_elements=["year"]))
+
+
+def allocate(db: Session, year: int, count: int = 1) -> range:
+    """Reserve ``count`` consecutive sequence values for ``year`` in ``db``'s transaction."""
+    if count < 1:
+        raise ValueError("count must be >= 1")
+    stmt = (
+        update(InvoiceSequence)
+        .where(InvoiceSequence.year == year)
+        .values(seq=InvoiceSequence.seq + count)
+        .returning(InvoiceSequence.seq)
+        .execution_options(synchronize_session=False)
+    )
+    end = db.execute(stmt).scalar()
+    if end is None:
+        _ensure_year(db, year)
+        end = db.execute(stmt).scalar()
+    return range(end - count + 1, end + 1)
+
+
+class BlockAllocator:
+    """Per-process pool of pre-reserved invoice numbers."""
+
+    def __init__(self, block_size: int) -> None:
+        if block_size < 1:
+            raise ValueError("block_size must be >= 1")
+        self.block_size = block_size
+        self._blocks: dict[int, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def _reserve(self, year: int, count: int) -> list[int]:
+        # Own transaction: the counter row is locked only for this statement
+        with get_session() as db, db.begin():
+            return list(allocate(db, year, count))
+
+    def take(self, year: int, count: int = 1) -> list[int]:
+        with self._lock:
+            pool = self._blocks.setdefault(year, [])
+            if len(pool) < count:
+                pool.extend(self._reserve(year, max(self.block_size, count - len(pool))))
+            taken, self._blocks[year] = pool[:count], pool[count:]
+            return taken
+
+    def release(self) -> list[int]:
+        """Return unused numbers to the counter where possible; returns the ones left as gaps."""
+        gaps: list[int] = []
+        with self._lock:
+            blocks, self._blocks = self._blocks, {}
+        for year, pool in blocks.items():
+            if not pool:
+                continue
+            start, end = pool[0], pool[-1]
+            with get_session() as db, db.begin():
+                # Only rewind if nobody allocated after our block
+                res = db.execute(
+                    update(InvoiceSequence)
+                    .where(InvoiceSequence.year == year, InvoiceSequence.seq == end)
+                    .values(seq=start - 1)
+                    .execution_options(synchronize_session=False)
+                )
+            if res.rowcount != 1:
+                gaps.extend(pool)
+        if gaps:
+            log.info("invoice numbers left unused: %s", gaps)
+        return gaps
+
+
+def find_gaps(db: Session, year: int) -> list[int]:
+    """Sequence values for ``year`` that were allocated but have no invoice."""
+    current = db.execute(select(InvoiceSequence.seq).where(InvoiceSequence.year == year)).scalar() or 0
+    prefix = f"{NUMBER_PREFIX}-{year}-"
+    used = set()
+    for number in db.execute(select(Invoice.invoice_number).where(Invoice.invoice_number.like(f"{prefix}%"))).scalars():
+        try:
+            used.add(int(number[len(prefix):]))
+        except ValueError:
+            continue
+    return [n for n in range(1, current + 1) if n not in used]
+
+
+_block_allocator: BlockAllocator | None = None
+_block_lock = threading.Lock()
+
+
+def get_block_allocator(block_size: int) -> BlockAllocator:
+    global _block_allocator
+    if _block_allocator is None:
+        with _block_lock:
+            if _block_allocator is None:
+                _block_allocator = BlockAllocator(block_size)
+                # Hand back the unused tail of our blocks on clean shutdown
+                atexit.register(_block_allocator.release)
+    return _block_allocator
+
+
+def next_invoice_numbers(db: Session, year: int, count: int = 1, block_size: int = 0) -> list[str]:
+    """Allocate ``count`` invoice numbers using the configured mode."""
+    if block_size > 0:
+        seqs = get_block_allocator(block_size).take(year, count)
+    else:
+        seqs = list(allocate(db, year, count))
+    return [format_invoice_number(year, s) for s in seqs]
@@ -0,0 +1,244 @@
+"""Invoice PDF rendering with an on-disk cache.
+
+PDFs are rendered by WeasyPrint in a process pool (CPU-heavy work stays out
+of the web worker) and cached as ``invoice-<id>-<hash>.pdf`` where ``hash``
+covers the invoice and its items. Any change to the invoice changes the key;
+updates and deletes also remove the old file via :func:`invalidate`.
+
+A render that outlives ``PDF_RENDER_TIMEOUT`` raises :class:`PdfRenderTimeout`
+to the caller but is left to finish in the pool; its result still lands in
+the cache (unless the invoice changed meanwhile), so a retry is served from
+disk.
+"""
+from __future__ import annotations
+
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config import Settings
+from app.db import get_session
+from app.models import Invoice
+from app.pdf_worker import render_pdf
+from app.services.invoices import get_invoice, invoice_to_dict
+
+
+class PdfUnavailable(RuntimeError):
+    """WeasyPrint is not installed in this environment."""
+
+
+class PdfRenderTimeout(RuntimeError):
+    """The render did not finish within ``PDF_RENDER_TIMEOUT``; it is still running."""
+
+
+INVOICE_TEMPLATE_SOURCE = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+  @page { size: A4; margin: 18mm; }
+  body { font-family: sans-serif; font-size: 11pt; color: #111; }
+  h1 { font-size: 20pt; margin: 0 0 4mm; }
+  .meta td { padding: 1mm 6mm 1mm 0; }
+  table.items { width: 100%; border-collapse: collapse; margin-top: 8mm; }
+  table.items th, table.items td { border-bottom: 1px solid #ccc; padding: 2mm; text-align: left; }
+  table.items td.num, table.items th.num { text-align: right; }
+  .total { text-align: right; font-size: 13pt; font-weight: bold; margin-top: 6mm; }
+  .notes { margin-top: 10mm; white-space: pre-wrap; }
+</style>
+</head>
+<body>
+  <h1>Invoice {{ invoice.invoice_number }}</h1>
+  <table class="meta">
+    <tr><td>From</td><td>{{ invoice.name }}</td></tr>
+    <tr><td>Date</td><td>{{ invoice.invoice_date }}</td></tr>
+    {% if invoice.bill_to %}<tr><td>Bill to</td><td>{{ invoice.bill_to }}</td></tr>{% endif %}
+  </table>
+  <table class="items">
+    <thead><tr><th>Item</th><th class="num">Qty</th><th class="num">Rate</th><th class="num">Amount</th></tr></thead>
+    <tbody>
+    {% for item in invoice["items"] %}
+      <tr>
+        <td>{{ item.item }}</td>
+        <td class="num">{{ "%.2f"|format(item.quantity) }}</td>
+        <td class="num">{{ "%.2f"|format(item.rate) }}</td>
+        <td class="num">{{ "%.2f"|format(item.amount) }}</td>
+      </tr>
+    {% endfor %}
+    </tbody>
+  </table>
+  <div class="total">Total: ${{ "{:,.2f}".format(invoice.total) }}</div>
+  {% if invoice.notes %}<div class="notes">{{ invoice.notes }}</div>{% endif %}
+</body>
+</html>
+"""
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def _invoice_template():
+    # Compiled on first render, not at import: app startup stays lazy
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                from jinja2 import Environment
+
+                _template = Environment(autoescape=True).from_string(INVOICE_TEMPLATE_SOURCE)
+    return _template
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: never fork a threaded web worker
+                _pool = ProcessPoolExecutor(
+                    max_workers=Settings().PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def _reset_pool() -> None:
+    # A crashed worker (e.g. OOM on a huge invoice) breaks the whole pool
+    global _pool
+    with _pool_lock:
+        broken, _pool = _pool, None
+    if broken is not None:
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+def download_name(invoice: Invoice) -> str:
+    return f"Allan - {invoice.invoice_number}.pdf"
+
+
+def _payload(invoice: Invoice) -> dict:
+    data = invoice_to_dict(invoice)
+    # Item ids do not affect the rendered output
+    data["items"] = [{k: v for k, v in i.items() if k != "id"} for i in data["items"]]
+    return data
+
+
+def content_hash(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+
+
+def _cache_dir() -> str:
+    path = Settings().PDF_CACHE_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_path(invoice_id: int, digest: str) -> str:
+    return os.path.join(_cache_dir(), f"invoice-{invoice_id}-{digest}.pdf")
+
+
+def invalidate(invoice_id: int, keep: str | None = None) -> None:
+    for path in glob.glob(os.path.join(_cache_dir(), f"invoice-{invoice_id}-*.pdf")):
+        if path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _submit(html: str):
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        raise PdfUnavailable("PDF rendering requires WeasyPrint (pip install WeasyPrint)") from None
+    try:
+        return _get_pool().submit(render_pdf, html)
+    except BrokenProcessPool:
+        _reset_pool()
+        return _get_pool().submit(render_pdf, html)
+
+
+def _store_late(future: Future, invoice_id: int, digest: str) -> None:
+    """Done-callback for renders that timed out: cache the result if still current.
+
+    The invoice may have been edited (or deleted) while the render ran; a PDF
+    of the old content is dropped rather than cached. Never calls
+    :func:`invalidate`, which could remove a newer PDF rendered meanwhile.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    with get_session() as db:
+        invoice = get_invoice(db, invoice_id)
+        if invoice is None or content_hash(_payload(invoice)) != digest:
+            return
+    _write(cache_path(invoice_id, digest), future.result())
+
+
+def ensure_pdf(invoice: Invoice) -> str:
+    """Return the path of an up-to-date PDF for ``invoice``, rendering it if needed.
+
+    Raises :class:`PdfRenderTimeout` when the render takes longer than
+    ``PDF_RENDER_TIMEOUT`` seconds.
+    """
+    payload = _payload(invoice)
+    invoice_id, digest = payload["id"], content_hash(payload)
+    path = cache_path(invoice_id, digest)
+    if os.path.exists(path):
+        return path
+    html = _invoice_template().render(invoice=payload)
+    future = _submit(html)
+    try:
+        data = future.result(timeout=Settings().PDF_RENDER_TIMEOUT)
+    except FutureTimeoutError:
+        # Runs after the request's session is gone: only plain values captured
+        future.add_done_callback(lambda f: _store_late(f, invoice_id, digest))
+        raise PdfRenderTimeout(f"PDF render for invoice {invoice_id} is still running") from None
+    except BrokenProcessPool:
+        _reset_pool()
+        raise
+    _write(path, data)
+    invalidate(invoice_id, keep=path)
+    return path
+
+
+def render_many(invoices: list[Invoice], progress=None) -> dict:
+    """Render every uncached invoice concurrently across the pool."""
+    pending = {}
+    cached = 0
+    for invoice in invoices:
+        payload = _payload(invoice)
+        path = cache_path(invoice.id, content_hash(payload))
+        if os.path.exists(path):
+            cached += 1
+            continue
+        pending[_submit(_invoice_template().render(invoice=payload))] = (invoice.id, path)
+
+    rendered = failed = 0
+    if progress is not None:
+        progress(cached=cached, rendered=0, failed=0, total=len(invoices))
+    for future in as_completed(pending):
+        invoice_id, path = pending[future]
+        try:
+            _write(path, future.result())
+            invalidate(invoice_id, keep=path)
+            rendered += 1
+        except Exception:
+            failed += 1
+        if progress is not None:
+            progress(rendered=rendered, failed=failed)
+    return {"total": len(invoices), "cached": cached, "rendered": rendered, "failed": failed}
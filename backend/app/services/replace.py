@@ -0,0 +1,172 @@
+"""Replace one batch's rows atomically.
+
+Used by ``POST /api/uploads/<source>`` with ``mode=replace``. The new file is
+first streamed into a temporary staging table (``COPY`` on Postgres,
+``executemany`` elsewhere) and committed; nothing touches the dataset table
+yet. Then one short transaction:
+
+1. locks the batch's catalog row (concurrent replaces of a batch queue here),
+2. inserts the ``uploads`` row,
+3. ``DELETE``s the batch's current rows,
+4. ``INSERT ... SELECT``s the staged rows,
+5. deletes the ``uploads`` rows the batch was built from that now have no
+   rows left anywhere (an upload can outlive a replace only if some of its
+   rows sit in another batch),
+6. overwrites the catalog row.
+
+Readers see either the old batch or the new one, never a partial period,
+and row locks are held only for the DELETE + INSERT ... SELECT, not for CSV
+parsing or upload transfer.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import time
+import uuid
+from typing import Iterable
+
+from sqlalchemy import Column, MetaData, Table, delete, exists, insert, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db import get_engine
+from app.models import DATASET_MODELS, Upload
+from app.partitions import ensure_partition
+from app.services import catalog
+
+# source -> columns parsed from the file (everything else comes from the request)
+STAGE_COLUMNS: dict[str, tuple[str, ...]] = {
+    "google": ("account_name", "campaign", "cost", "campaign_id", "name_key"),
+    "binom-google": ("name", "leads", "revenue", "campaign_id", "name_key"),
+}
+# Rows per executemany round trip when COPY is not available
+STAGE_CHUNK = 5000
+
+
+def _stage_table(source: str) -> Table:
+    model_table = DATASET_MODELS[source].__table__
+    return Table(
+        f"stage_{model_table.name}_{uuid.uuid4().hex[:8]}",
+        MetaData(),
+        *[Column(name, model_table.c[name].type) for name in STAGE_COLUMNS[source]],
+        prefixes=["TEMPORARY"],
+    )
+
+
+def _load_stage(conn: Connection, stage: Table, source: str, rows: Iterable[dict]) -> tuple[int, float, float]:
+    """Stream ``rows`` into ``stage``; returns (rows, spend, revenue)."""
+    columns = STAGE_COLUMNS[source]
+    spend_col, revenue_col = catalog.MEASURES[source]
+    count, spend, revenue = 0, 0.0, 0.0
+
+    if conn.dialect.name == "postgresql":
+        cursor = conn.connection.cursor()
+        try:
+            with cursor.copy(f'COPY "{stage.name}" ({", ".join(columns)}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row([row.get(c) for c in columns])
+                    count += 1
+                    spend += (row.get(spend_col) or 0.0) if spend_col else 0.0
+                    revenue += (row.get(revenue_col) or 0.0) if revenue_col else 0.0
+        finally:
+            cursor.close()
+        return count, spend, revenue
+
+    chunk: list[dict] = []
+    for row in rows:
+        chunk.append({c: row.get(c) for c in columns})
+        count += 1
+        spend += (row.get(spend_col) or 0.0) if spend_col else 0.0
+        revenue += (row.get(revenue_col) or 0.0) if revenue_col else 0.0
+        if len(chunk) >= STAGE_CHUNK:
+            conn.execute(stage.insert(), chunk)
+            chunk = []
+    if chunk:
+        conn.execute(stage.insert(), chunk)
+    return count, spend, revenue
+
+
+def replace_batch(
+    source: str,
+    rows: Iterable[dict],
+    date_from: dt.date,
+    date_to: dt.date,
+    report_type: str,
+    filename: str,
+) -> dict:
+    """Replace the (date_from, date_to, report_type) batch of ``source`` with ``rows``.
+
+    Returns counts and timings; ``inserted == 0`` means nothing was changed.
+    """
+    model = DATASET_MODELS[source]
+    columns = STAGE_COLUMNS[source]
+    stage = _stage_table(source)
+    started = time.perf_counter()
+
+    with get_engine().connect() as conn:
+        stage.create(conn)
+        try:
+            count, spend, revenue = _load_stage(conn, stage, source, rows)
+            conn.commit()
+            staged = time.perf_counter()
+            if count == 0:
+                return {"inserted": 0, "replaced": 0}
+            ensure_partition(model.__tablename__, date_from)
+
+            # -- the swap: one short transaction -----------------------------
+            now = dt.datetime.now(dt.timezone.utc)
+            with Session(bind=conn) as db:  # joins the connection's transaction
+                batch = catalog.lock_batch(db, source, date_from, date_to, report_type)
+                upload = Upload(source_type=source, filename=filename, checksum=None, uploaded_at=now)
+                db.add(upload)
+                db.flush()
+                replaced = db.execute(
+                    delete(model).where(
+                        model.date_from == date_from,
+                        model.date_to == date_to,
+                        model.report_type == report_type,
+                    )
+                ).rowcount
+                db.execute(
+                    insert(model).from_select(
+                        [*columns, "date_from", "date_to", "report_type", "upload_id"],
+                        select(
+                            *[stage.c[c] for c in columns],
+                            literal(date_from, model.date_from.type),
+                            literal(date_to, model.date_to.type),
+                            literal(report_type, model.report_type.type),
+                            literal(upload.id, model.upload_id.type),
+                        ),
+                    )
+                )
+                superseded = [u for u in (batch.upload_ids or []) if u != upload.id]
+                if superseded:
+                    db.execute(
+                        delete(Upload)
+                        .where(
+                            Upload.id.in_(superseded),
+                            ~exists().where(model.upload_id == Upload.id),
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                catalog.record_replace(batch, upload.id, now, count, spend, revenue)
+                db.flush()
+                conn.commit()
+                upload_id = upload.id
+            swapped = time.perf_counter()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            stage.drop(conn, checkfirst=True)
+            conn.commit()
+
+    return {
+        "upload_id": upload_id,
+        "inserted": count,
+        "replaced": replaced,
+        "spend_total": round(spend, 2),
+        "revenue_total": round(revenue, 2),
+        "stage_ms": round((staged - started) * 1000, 1),
+        "swap_ms": round((swapped - staged) * 1000, 1),
+    }
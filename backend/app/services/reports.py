@@ -0,0 +1,365 @@
+"""Report computation shared by the report endpoints and invoice generation."""
+from __future__ import annotations
+
+import datetime as dt
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from operator import attrgetter
+from typing import Dict, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import BinomGoogleSpentData, DatasetBatch, GoogleData
+from app.services.matching import join_key
+from app.services.snapshots import get_snapshot_store
+
+
+@dataclass(slots=True)
+class ReportRow:
+    """One joined report line; slots keep 100k-row reports compact in memory."""
+
+    campaign: str | None
+    name: str
+    spend: float
+    revenue: float
+    pl: float
+    roi: float | None
+    leads: int
+
+    def as_dict(self) -> dict:
+        return {
+            "campaign": self.campaign,
+            "name": self.name,
+            "spend": self.spend,
+            "revenue": self.revenue,
+            "pl": self.pl,
+            "roi": self.roi,
+            "leads": self.leads,
+        }
+
+
+# Column order for the columnar response shape ({"columns": [...], "data": [[...]]})
+REPORT_COLUMNS = ["campaign", "name", "spend", "revenue", "pl", "roi", "leads"]
+_row_values = attrgetter(*REPORT_COLUMNS)  # C-level: row -> tuple in column order
+
+
+def rows_payload(rows: list[ReportRow], shape: str = "rows"):
+    """Serialize rows as a list of objects (default) or, with ``shape="columns"``, column-major."""
+    if shape == "columns":
+        return {"columns": REPORT_COLUMNS, "data": list(map(_row_values, rows))}
+    return [r.as_dict() for r in rows]
+
+
+@dataclass(slots=True)
+class ReportInputs:
+    """Per-key aggregates of one period, before the Google/Binom join.
+
+    One entry per join key (see ``matching.join_key``); the label is the
+    alphabetically first campaign/name seen under that key.
+    """
+
+    google: list[tuple[str, str, float]]  # (key, campaign, spend)
+    binom: list[tuple[str, str, float, int]]  # (key, name, revenue, leads)
+    source: str  # "sql" | "snapshot"
+
+
+def _sql_inputs(db: Session, report_type: str, date_from: dt.date, date_to: dt.date) -> ReportInputs:
+    # Aggregate Google spend per join identity (stored at ingest, indexed)
+    g_stmt = (
+        select(
+            GoogleData.campaign_id,
+            GoogleData.name_key,
+            func.min(GoogleData.campaign),
+            func.sum(GoogleData.cost).label("spend"),
+        )
+        .where(
+            GoogleData.date_from == date_from,
+            GoogleData.date_to == date_to,
+            GoogleData.report_type == report_type,
+        )
+        .group_by(GoogleData.campaign_id, GoogleData.name_key)
+    )
+
+    # Aggregate Binom revenue/leads per join identity
+    b_stmt = (
+        select(
+            BinomGoogleSpentData.campaign_id,
+            BinomGoogleSpentData.name_key,
+            func.min(BinomGoogleSpentData.name),
+            func.sum(BinomGoogleSpentData.revenue).label("revenue"),
+            func.sum(BinomGoogleSpentData.leads).label("leads"),
+        )
+        .where(
+            BinomGoogleSpentData.date_from == date_from,
+            BinomGoogleSpentData.date_to == date_to,
+            BinomGoogleSpentData.report_type == report_type,
+        )
+        .group_by(BinomGoogleSpentData.campaign_id, BinomGoogleSpentData.name_key)
+    )
+
+    # Several (campaign_id, name_key) groups can share a join key (one ID
+    # under differently spelled names): merge those, summing exactly.
+    google: dict[str, tuple] = {}
+    for campaign_id, name_key, campaign, spend in db.execute(g_stmt):
+        key = join_key(campaign_id, name_key)
+        if not key:
+            continue
+        prev = google.get(key)
+        if prev is None:
+            google[key] = (campaign or "", spend or 0)
+        else:
+            google[key] = (min(prev[0], campaign or ""), prev[1] + (spend or 0))
+    binom: dict[str, tuple] = {}
+    for campaign_id, name_key, name, revenue, leads in db.execute(b_stmt):
+        key = join_key(campaign_id, name_key)
+        if not key:
+            continue
+        prev = binom.get(key)
+        if prev is None:
+            binom[key] = (name or "", revenue or 0, int(leads or 0))
+        else:
+            binom[key] = (min(prev[0], name or ""), prev[1] + (revenue or 0), prev[2] + int(leads or 0))
+    return ReportInputs(
+        [(key, label, float(spend)) for key, (label, spend) in google.items()],
+        [(key, label, float(revenue), leads) for key, (label, revenue, leads) in binom.items()],
+        "sql",
+    )
+
+
+def report_inputs(db: Session, report_type: str, date_from: dt.date, date_to: dt.date) -> ReportInputs:
+    """Group aggregates from the period's columnar snapshot when it has one, else from SQL."""
+    store = get_snapshot_store()
+    snap = store.get(db, report_type, date_from, date_to) if store is not None else None
+    if snap is not None:
+        return ReportInputs(snap.google_groups(), snap.binom_groups(), "snapshot")
+    return _sql_inputs(db, report_type, date_from, date_to)
+
+
+def join_rows(inputs: ReportInputs) -> tuple[list[ReportRow], dict]:
+    """Join Google and Binom groups on their join key; returns (rows, summary).
+
+    Spend and revenue are exact sums to the cent; only derived values (P/L,
+    ROI) are rounded.
+    """
+    # Keys are unique per side, so the join is one dict lookup per Google group
+    g_map: Dict[str, Tuple[str, float]] = {key: (campaign, spend) for key, campaign, spend in inputs.google}
+    b_map: Dict[str, Tuple[str, float, int]] = {
+        key: (name, revenue, leads) for key, name, revenue, leads in inputs.binom
+    }
+
+    # Join
+    seen = set()
+    rows: list[ReportRow] = []
+    append = rows.append
+    total_spend = 0.0
+    total_revenue = 0.0
+    for key, (campaign, spend) in g_map.items():
+        name = campaign
+        revenue = 0.0
+        leads = 0
+        match = b_map.get(key)
+        if match is not None:
+            _bname, revenue, leads = match
+            name = _bname or campaign
+            seen.add(key)
+        roi = (revenue / spend * 100.0) if spend and revenue else (0.0 if spend else None)
+        append(
+            ReportRow(
+                campaign,
+                name,
+                spend,
+                revenue,
+                round(revenue - spend, 2),
+                round(roi, 2) if roi is not None else None,
+                leads,
+            )
+        )
+        total_spend += spend
+        total_revenue += revenue
+
+    # Include Binom-only rows to preserve totals
+    for key, (bname, brevenue, bleads) in b_map.items():
+        if key in seen:
+            continue
+        append(ReportRow(None, bname, 0.0, brevenue, brevenue, None, bleads))
+        total_revenue += brevenue
+
+    summary = {
+        "spend": round(total_spend, 2),
+        "revenue": round(total_revenue, 2),
+        "pl": round(total_revenue - total_spend, 2),
+        "roi": (round((total_revenue / total_spend * 100.0), 2) if total_spend else None),
+        "roi_last": None,  # computed when prior period is implemented
+    }
+    return rows, summary
+
+
+def google_binom_rows(
+    db: Session, report_type: str, date_from: dt.date, date_to: dt.date
+) -> tuple[list[ReportRow], dict]:
+    """Join Google spend and Binom revenue for one period; returns (rows, summary)."""
+    return join_rows(report_inputs(db, report_type, date_from, date_to))
+
+
+def report_periods(db: Session, report_type: str, date_from: dt.date, date_to: dt.date) -> list[tuple]:
+    """(date_from, date_to) of every Google or Binom batch inside the range, oldest first."""
+    stmt = (
+        select(DatasetBatch.date_from, DatasetBatch.date_to)
+        .where(
+            DatasetBatch.source.in_(("google", "binom-google")),
+            DatasetBatch.report_type == report_type,
+            DatasetBatch.date_from >= date_from,
+            DatasetBatch.date_to <= date_to,
+        )
+        .distinct()
+        .order_by(DatasetBatch.date_from, DatasetBatch.date_to)
+    )
+    return [tuple(r) for r in db.execute(stmt)]
+
+
+def google_binom_trend(
+    db: Session, report_type: str, date_from: dt.date, date_to: dt.date, top: int = 0
+) -> dict:
+    """Per-period totals across a range, plus spend/revenue series for the ``top`` keys by spend.
+
+    Closed periods are aggregated from their snapshots, open ones in SQL.
+    """
+    periods = []
+    per_key: list[dict[str, list[float]]] = []
+    labels: dict[str, str] = {}
+    key_spend: dict[str, float] = defaultdict(float)
+    for p_from, p_to in report_periods(db, report_type, date_from, date_to):
+        inputs = report_inputs(db, report_type, p_from, p_to)
+        spend = sum(g[2] for g in inputs.google)
+        revenue = sum(b[2] for b in inputs.binom)
+        periods.append(
+            {
+                "date_from": str(p_from),
+                "date_to": str(p_to),
+                "spend": round(spend, 2),
+                "revenue": round(revenue, 2),
+                "pl": round(revenue - spend, 2),
+                "roi": round(revenue / spend * 100.0, 2) if spend else None,
+                "leads": sum(b[3] for b in inputs.binom),
+                "source": inputs.source,
+            }
+        )
+        if top > 0:
+            values: dict[str, list[float]] = defaultdict(lambda: [0.0, 0.0])
+            for key, campaign, g_spend in inputs.google:
+                if key:
+                    values[key][0] += g_spend
+                    key_spend[key] += g_spend
+                    labels.setdefault(key, campaign)
+            for key, name, b_revenue, _leads in inputs.binom:
+                if key:
+                    values[key][1] += b_revenue
+                    labels.setdefault(key, name)
+            per_key.append(values)
+
+    series = []
+    for key in sorted(key_spend, key=key_spend.get, reverse=True)[:top]:
+        points = [p.get(key, (0.0, 0.0)) for p in per_key]
+        series.append(
+            {
+                "key": key,
+                "label": labels[key],
+                "spend": [round(s, 2) for s, _ in points],
+                "revenue": [round(r, 2) for _, r in points],
+            }
+        )
+    return {"periods": periods, "top": series}
+
+
+def _identity_groups(db: Session, model, label_col, measure_col, report_type, date_from, date_to) -> dict:
+    """join key -> {campaign_id, name_key, labels: {label: measure}, total} for one side of a period."""
+    stmt = (
+        select(model.campaign_id, model.name_key, label_col, func.sum(measure_col))
+        .where(model.date_from == date_from, model.date_to == date_to, model.report_type == report_type)
+        .group_by(model.campaign_id, model.name_key, label_col)
+    )
+    groups: dict[str, dict] = {}
+    for campaign_id, name_key, label, total in db.execute(stmt):
+        key = join_key(campaign_id, name_key)
+        group = groups.setdefault(
+            key, {"campaign_id": campaign_id, "name_key": name_key, "labels": {}, "total": Decimal(0)}
+        )
+        group["labels"][label or ""] = float(total or 0)
+        group["total"] += total or 0
+    return groups
+
+
+def match_diagnostics(
+    db: Session, report_type: str, date_from: dt.date, date_to: dt.date, limit: int = 100
+) -> dict:
+    """Keys that do not join, and keys that several distinct campaigns/names collapse onto."""
+    google = _identity_groups(
+        db, GoogleData, GoogleData.campaign, GoogleData.cost, report_type, date_from, date_to
+    )
+    binom = _identity_groups(
+        db,
+        BinomGoogleSpentData,
+        BinomGoogleSpentData.name,
+        BinomGoogleSpentData.revenue,
+        report_type,
+        date_from,
+        date_to,
+    )
+    g_names = {g["name_key"] for g in google.values() if g["name_key"]}
+    b_names = {b["name_key"] for b in binom.values() if b["name_key"]}
+
+    def unmatched(side: dict, other: dict, other_names: set, measure: str) -> list[dict]:
+        out = [
+            {
+                "key": key,
+                "campaign_id": group["campaign_id"],
+                "labels": sorted(group["labels"]),
+                measure: round(float(group["total"]), 2),
+                # Same sanitized name exists on the other side but the IDs differ or one is missing
+                "name_match_on_other_side": bool(group["name_key"]) and group["name_key"] in other_names,
+            }
+            for key, group in side.items()
+            if key not in other
+        ]
+        out.sort(key=lambda u: u[measure], reverse=True)
+        return out
+
+    def collisions(side: dict, source: str) -> list[dict]:
+        return [
+            {"source": source, "key": key, "labels": sorted(group["labels"])}
+            for key, group in side.items()
+            if key and len(group["labels"]) > 1
+        ]
+
+    unmatched_google = unmatched(google, binom, b_names, "spend")
+    unmatched_binom = unmatched(binom, google, g_names, "revenue")
+    colliding = collisions(google, "google") + collisions(binom, "binom-google")
+    return {
+        "google_keys": len(google),
+        "binom_keys": len(binom),
+        "matched": len(google.keys() & binom.keys()),
+        "matched_by_id": sum(1 for k in google.keys() & binom.keys() if k.startswith("id:")),
+        "unmatched_google_total": len(unmatched_google),
+        "unmatched_binom_total": len(unmatched_binom),
+        "collisions_total": len(colliding),
+        "unmatched_google": unmatched_google[:limit],
+        "unmatched_binom": unmatched_binom[:limit],
+        "collisions": colliding[:limit],
+    }
+
+
+def google_accounts(db: Session, report_type: str, date_from: dt.date, date_to: dt.date) -> dict[str, str]:
+    """Campaign -> Google account name for one period."""
+    stmt = (
+        select(GoogleData.campaign, func.min(GoogleData.account_name))
+        .where(
+            GoogleData.date_from == date_from,
+            GoogleData.date_to == date_to,
+            GoogleData.report_type == report_type,
+            GoogleData.account_name.is_not(None),
+        )
+        .group_by(GoogleData.campaign)
+    )
+    return {campaign: account for campaign, account in db.execute(stmt) if campaign}
@@ -0,0 +1,335 @@
+"""Columnar snapshots of closed report periods.
+
+Once a period is closed (``date_to`` more than ``SNAPSHOT_CLOSED_AFTER_DAYS``
+ago) its Google and Binom rows are written once to a directory of ``.npy``
+files and read back memory-mapped, so reports and trends over history are
+aggregated in-process with ``numpy.bincount`` instead of by Postgres.
+
+Layout of one snapshot (``<SNAPSHOT_DIR>/google-binom/<report_type>/<from>_<to>-<stamp>/``)::
+
+    meta.json               period, row counts, the join-key dictionary shared by
+                            both sides (``id:<campaign_id>`` / ``name:<name_key>``,
+                            see app.services.matching) and per-key labels
+    google_key.npy          int32  per Google row: index into keys
+    google_cost.npy         int64  per Google row: cost in cents
+    binom_key.npy           int32  per Binom row: index into keys
+    binom_revenue.npy       int64  per Binom row: revenue in cents
+    binom_leads.npy         int64  per Binom row: leads
+
+Keys come from the ``campaign_id`` / ``name_key`` columns stored at ingest;
+rows without either are left out (they can never match).
+
+``<stamp>`` is a digest of the period's ``dataset_batches`` rows
+(``catalog.fingerprint``), so any later upload or delete for the period makes
+the snapshot unreachable and reports fall back to SQL until it is rebuilt.
+Open periods always use SQL. numpy is optional: without it (or with
+``SNAPSHOTS=0``) :func:`get_snapshot_store` returns None.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app.db import get_session
+from app.jobs import get_job_runner
+from app.models import BinomGoogleSpentData, GoogleData
+from app.services import catalog
+from app.services.matching import join_key
+
+FORMAT_VERSION = 2
+SOURCES = ("google", "binom-google")
+# Snapshots kept open (memory-mapped) at once
+MAX_LOADED = 64
+
+
+class SnapshotsUnavailable(RuntimeError):
+    """numpy is not installed in this environment."""
+
+
+def _np():
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on environment
+        raise SnapshotsUnavailable("report snapshots require numpy (pip install numpy)") from exc
+    return numpy
+
+
+def _cents(value) -> int:
+    return int(round((value or 0) * 100))
+
+
+def stamp(fingerprint: tuple) -> str:
+    # The format version is part of the stamp, so older layouts are never loaded
+    return hashlib.sha1(repr((FORMAT_VERSION, fingerprint)).encode("utf-8")).hexdigest()[:16]
+
+
+class Snapshot:
+    """One period's columns, memory-mapped read-only."""
+
+    def __init__(self, path: str) -> None:
+        np = _np()
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")  # noqa: E731
+        self.google_key = load("google_key")
+        self.google_cost = load("google_cost")
+        self.binom_key = load("binom_key")
+        self.binom_revenue = load("binom_revenue")
+        self.binom_leads = load("binom_leads")
+        self.keys = self.meta["keys"]
+        self.google_labels = self.meta["google_labels"]
+        self.binom_labels = self.meta["binom_labels"]
+
+    def google_groups(self) -> list[tuple[str, str, float]]:
+        """``(key, campaign, spend)`` per join key, summed with one bincount."""
+        np = _np()
+        n = len(self.keys)
+        cents = np.bincount(self.google_key, weights=self.google_cost, minlength=n)
+        present = np.flatnonzero(np.bincount(self.google_key, minlength=n)).tolist()
+        keys, labels, spend = self.keys, self.google_labels, (cents / 100.0).tolist()
+        return [(keys[i], labels[i], spend[i]) for i in present]
+
+    def binom_groups(self) -> list[tuple[str, str, float, int]]:
+        """``(key, name, revenue, leads)`` per join key."""
+        np = _np()
+        n = len(self.keys)
+        revenue = (np.bincount(self.binom_key, weights=self.binom_revenue, minlength=n) / 100.0).tolist()
+        leads = np.bincount(self.binom_key, weights=self.binom_leads, minlength=n).astype(np.int64).tolist()
+        present = np.flatnonzero(np.bincount(self.binom_key, minlength=n)).tolist()
+        keys, labels = self.keys, self.binom_labels
+        return [(keys[i], labels[i], revenue[i], leads[i]) for i in present]
+
+
+class SnapshotStore:
+    def __init__(self, root: str, closed_after_days: int = 3) -> None:
+        self.root = root
+        self.closed_after_days = closed_after_days
+        self._loaded: OrderedDict[str, Snapshot] = OrderedDict()
+        self._building: set[tuple] = set()
+        self._lock = threading.Lock()
+
+    # -- lookup -------------------------------------------------------------
+
+    def is_closed(self, date_to: dt.date, today: dt.date | None = None) -> bool:
+        today = today or dt.date.today()
+        return (today - date_to).days > self.closed_after_days
+
+    def _period_dir(self, report_type: str, date_from: dt.date, date_to: dt.date) -> str:
+        return os.path.join(self.root, "google-binom", report_type, f"{date_from}_{date_to}")
+
+    def get(
+        self, db: Session, report_type: str, date_from: dt.date, date_to: dt.date, build: bool = True
+    ) -> Snapshot | None:
+        """Current snapshot of a closed period, or None (SQL fallback).
+
+        A missing or stale snapshot is rebuilt in the background when ``build``.
+        """
+        if not self.is_closed(date_to):
+            return None
+        fp = catalog.fingerprint(db, SOURCES, date_from, date_to, report_type)
+        if not fp:
+            return None
+        path = f"{self._period_dir(report_type, date_from, date_to)}-{stamp(fp)}"
+        with self._lock:
+            snap = self._loaded.get(path)
+            if snap is not None:
+                self._loaded.move_to_end(path)
+                return snap
+        if os.path.isdir(path):
+            snap = Snapshot(path)
+            with self._lock:
+                self._loaded[path] = snap
+                while len(self._loaded) > MAX_LOADED:
+                    self._loaded.popitem(last=False)
+            return snap
+        if build:
+            self.schedule_build(report_type, date_from, date_to)
+        return None
+
+    # -- building -----------------------------------------------------------
+
+    def schedule_build(self, report_type: str, date_from: dt.date, date_to: dt.date):
+        key = (report_type, date_from, date_to)
+        with self._lock:
+            if key in self._building:
+                return None
+            self._building.add(key)
+        return get_job_runner().submit(
+            f"snapshot:{report_type}:{date_from}_{date_to}", self._build_job, report_type, date_from, date_to
+        )
+
+    def _build_job(self, job, report_type: str, date_from: dt.date, date_to: dt.date) -> dict:
+        try:
+            with get_session() as db:
+                return self.build(db, report_type, date_from, date_to)
+        finally:
+            with self._lock:
+                self._building.discard((report_type, date_from, date_to))
+
+    def build(self, db: Session, report_type: str, date_from: dt.date, date_to: dt.date) -> dict:
+        """Write the snapshot of one period; replaces older snapshots of it."""
+        np = _np()
+
+        # Stamp first: a write landing during the build changes the period's
+        # fingerprint, so files built from mixed data are never looked up.
+        fp = catalog.fingerprint(db, SOURCES, date_from, date_to, report_type)
+        google = db.execute(
+            select(GoogleData.campaign_id, GoogleData.name_key, GoogleData.campaign, GoogleData.cost).where(
+                GoogleData.date_from == date_from,
+                GoogleData.date_to == date_to,
+                GoogleData.report_type == report_type,
+            )
+        ).all()
+        binom = db.execute(
+            select(
+                BinomGoogleSpentData.campaign_id,
+                BinomGoogleSpentData.name_key,
+                BinomGoogleSpentData.name,
+                BinomGoogleSpentData.revenue,
+                BinomGoogleSpentData.leads,
+            ).where(
+                BinomGoogleSpentData.date_from == date_from,
+                BinomGoogleSpentData.date_to == date_to,
+                BinomGoogleSpentData.report_type == report_type,
+            )
+        ).all()
+
+        # Join key per row from the stored identity columns; keyless rows never match
+        google = [(join_key(cid, nk), label or "", cost) for cid, nk, label, cost in google]
+        google = [r for r in google if r[0]]
+        binom = [(join_key(cid, nk), label or "", rev, leads) for cid, nk, label, rev, leads in binom]
+        binom = [r for r in binom if r[0]]
+
+        # Dictionary-encode the join key (shared by both sides): sorted keys + int32 codes
+        keys, codes = np.unique(
+            np.array([r[0] for r in google] + [r[0] for r in binom], dtype=object), return_inverse=True
+        )
+        keys = keys.tolist()
+        codes = codes.astype(np.int32)
+        google_labels: list[str | None] = [None] * len(keys)
+        binom_labels: list[str | None] = [None] * len(keys)
+        for code, (_, label, _) in zip(codes[: len(google)].tolist(), google):
+            if google_labels[code] is None or label < google_labels[code]:
+                google_labels[code] = label
+        for code, (_, label, _, _) in zip(codes[len(google) :].tolist(), binom):
+            if binom_labels[code] is None or label < binom_labels[code]:
+                binom_labels[code] = label
+
+        arrays = {
+            "google_key": codes[: len(google)],
+            "google_cost": np.fromiter((_cents(r[2]) for r in google), dtype=np.int64, count=len(google)),
+            "binom_key": codes[len(google) :],
+            "binom_revenue": np.fromiter((_cents(r[2]) for r in binom), dtype=np.int64, count=len(binom)),
+            "binom_leads": np.fromiter((int(r[3] or 0) for r in binom), dtype=np.int64, count=len(binom)),
+        }
+        meta = {
+            "version": FORMAT_VERSION,
+            "report_type": report_type,
+            "date_from": str(date_from),
+            "date_to": str(date_to),
+            "stamp": stamp(fp),
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+            "google_rows": len(google),
+            "binom_rows": len(binom),
+            "keys": keys,
+            "google_labels": google_labels,
+            "binom_labels": binom_labels,
+        }
+
+        base = self._period_dir(report_type, date_from, date_to)
+        final = f"{base}-{meta['stamp']}"
+        tmp = f"{base}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp)
+        try:
+            for name, arr in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), arr)
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as fh:
+                json.dump(meta, fh)
+            if os.path.isdir(final):
+                shutil.rmtree(tmp)
+            else:
+                os.rename(tmp, final)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self._remove(glob.glob(f"{glob.escape(base)}-*"), keep=final)
+        return {k: meta[k] for k in ("report_type", "date_from", "date_to", "stamp", "google_rows", "binom_rows")}
+
+    # -- maintenance --------------------------------------------------------
+
+    def list(self) -> list[dict]:
+        out = []
+        for meta_path in sorted(glob.glob(os.path.join(glob.escape(self.root), "google-binom", "*", "*", "meta.json"))):
+            path = os.path.dirname(meta_path)
+            with open(meta_path, encoding="utf-8") as fh:
+                meta = json.load(fh)
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            out.append(
+                {
+                    **{k: meta[k] for k in ("report_type", "date_from", "date_to", "stamp", "created_at")},
+                    "google_rows": meta["google_rows"],
+                    "binom_rows": meta["binom_rows"],
+                    "keys": len(meta["keys"]),
+                    "bytes": size,
+                }
+            )
+        return out
+
+    def invalidate(
+        self, report_type: str | None = None, date_from: dt.date | None = None, date_to: dt.date | None = None
+    ) -> int:
+        """Delete snapshots, optionally only those of one period. Returns how many were removed."""
+        if report_type and date_from and date_to:
+            pattern = f"{glob.escape(self._period_dir(report_type, date_from, date_to))}-*"
+        else:
+            pattern = os.path.join(glob.escape(self.root), "google-binom", "*", "*")
+        return self._remove(glob.glob(pattern))
+
+    def _remove(self, paths: list[str], keep: str | None = None) -> int:
+        removed = 0
+        for path in paths:
+            if path == keep or not os.path.isdir(path):
+                continue
+            with self._lock:
+                self._loaded.pop(path, None)
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        return removed
+
+
+_store: SnapshotStore | None = None
+_store_checked = False
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore | None:
+    """Process-wide store, or None when disabled (``SNAPSHOTS=0``) or numpy is missing."""
+    global _store, _store_checked
+    if not _store_checked:
+        with _store_lock:
+            if not _store_checked:
+                settings = Settings()
+                enabled = settings.SNAPSHOTS != "0"
+                if enabled:
+                    try:
+                        _np()
+                    except SnapshotsUnavailable:
+                        if settings.SNAPSHOTS == "1":
+                            raise
+                        enabled = False
+                if enabled:
+                    _store = SnapshotStore(settings.SNAPSHOT_DIR, settings.SNAPSHOT_CLOSED_AFTER_DAYS)
+                _store_checked = True
+    return _store
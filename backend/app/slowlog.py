@@ -0,0 +1,228 @@
+"""Slow-query log.
+
+Times every statement executed through the engine. Statements above
+``Settings.SLOW_QUERY_MS`` are logged with their parameters and the route that
+issued them, aggregated per statement text, and (on Postgres) get an
+``EXPLAIN (ANALYZE, BUFFERS)`` plan captured on a background thread so the
+request that triggered it is not slowed down further. Locking reads
+(``SELECT ... FOR UPDATE``) and selects calling side-effecting functions
+(``nextval`` and friends) only get a plain ``EXPLAIN``: re-running them would
+take the same row locks again or advance sequences.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import Settings
+
+log = logging.getLogger(__name__)
+
+# Keep memory bounded: when full, the entry with the smallest total time is evicted
+MAX_ENTRIES = 500
+# Only plain reads are re-run under EXPLAIN ANALYZE; DML would execute twice
+_EXPLAINABLE = ("SELECT",)
+# ...but these are planned without executing them
+_NO_ANALYZE_RE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+)?UPDATE\b|\bFOR\s+(?:KEY\s+)?SHARE\b"
+    r"|\b(?:nextval|setval|pg_advisory_\w*|pg_try_advisory_\w*)\s*\(",
+    re.IGNORECASE,
+)
+
+
+def _explain_prefix(statement: str) -> str:
+    if _NO_ANALYZE_RE.search(statement):
+        return "EXPLAIN"
+    return "EXPLAIN (ANALYZE, BUFFERS)"
+
+
+@dataclass
+class SlowStatement:
+    statement: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+    last_params: Any = None
+    last_route: str | None = None
+    last_endpoint: str | None = None
+    last_seen: dt.datetime | None = None
+    plan: str | None = None
+    plan_captured_at: dt.datetime | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "statement": self.statement,
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.calls, 2) if self.calls else None,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+            "last_params": _jsonable(self.last_params),
+            "last_route": self.last_route,
+            "last_endpoint": self.last_endpoint,
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "plan": self.plan,
+            "plan_captured_at": self.plan_captured_at.isoformat() if self.plan_captured_at else None,
+        }
+
+
+def _jsonable(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return str(value)
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, explain: bool = True, explain_interval: int = 300) -> None:
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self._entries: dict[str, SlowStatement] = {}
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    # -- engine hooks -------------------------------------------------------
+
+    def install(self, engine: Engine | type[Engine]) -> None:
+        if event.contains(engine, "after_cursor_execute", self._after_cursor_execute):
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slowlog_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_slowlog_start", None)
+        if start is None or context.execution_options.get("slowlog_skip"):
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        if elapsed_ms < self.threshold_ms:
+            return
+
+        route = endpoint = None
+        if has_request_context():
+            route = f"{request.method} {request.path}"
+            endpoint = request.endpoint
+        params = None if executemany else parameters
+        log.warning(
+            "slow query %.1fms route=%s params=%r sql=%s",
+            elapsed_ms,
+            route,
+            params if not executemany else f"<executemany x{len(parameters)}>",
+            " ".join(statement.split()),
+        )
+        should_explain = self._record(statement, elapsed_ms, params, route, endpoint)
+        if should_explain and not executemany and conn.dialect.name == "postgresql":
+            self._submit_explain(conn.engine, statement, parameters)
+
+    # -- aggregation --------------------------------------------------------
+
+    def _record(self, statement, elapsed_ms, params, route, endpoint) -> bool:
+        now = dt.datetime.now(dt.timezone.utc)
+        with self._lock:
+            entry = self._entries.get(statement)
+            if entry is None:
+                if len(self._entries) >= MAX_ENTRIES:
+                    victim = min(self._entries.values(), key=lambda e: e.total_ms)
+                    del self._entries[victim.statement]
+                entry = self._entries[statement] = SlowStatement(statement=statement)
+            entry.calls += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.last_ms = elapsed_ms
+            entry.last_params = params
+            entry.last_route = route
+            entry.last_endpoint = endpoint
+            entry.last_seen = now
+
+            if not self.explain or statement in self._pending:
+                return False
+            if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+                return False
+            if entry.plan_captured_at is not None and (
+                (now - entry.plan_captured_at).total_seconds() < self.explain_interval
+            ):
+                return False
+            self._pending.add(statement)
+            return True
+
+    def top(self, limit: int = 20, order_by: str = "total_ms") -> list[dict]:
+        with self._lock:
+            entries = list(self._entries.values())
+        if order_by not in {"total_ms", "max_ms", "calls"}:
+            order_by = "total_ms"
+        entries.sort(key=lambda e: getattr(e, order_by), reverse=True)
+        return [e.to_dict() for e in entries[:limit]]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # -- plan capture -------------------------------------------------------
+
+    def _submit_explain(self, engine: Engine, statement: str, parameters: Any) -> None:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # A single worker keeps plan capture from competing with real traffic
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slowlog-explain")
+        self._executor.submit(self._capture_plan, engine, statement, parameters)
+
+    def _capture_plan(self, engine: Engine, statement: str, parameters: Any) -> None:
+        plan = None
+        try:
+            with engine.connect() as conn:
+                conn = conn.execution_options(slowlog_skip=True)
+                result = conn.exec_driver_sql(f"{_explain_prefix(statement)} {statement}", parameters)
+                plan = "\n".join(row[0] for row in result)
+                conn.rollback()
+        except Exception:
+            log.exception("failed to capture plan for slow query")
+        finally:
+            with self._lock:
+                self._pending.discard(statement)
+                entry = self._entries.get(statement)
+                if entry is not None and plan is not None:
+                    entry.plan = plan
+                    entry.plan_captured_at = dt.datetime.now(dt.timezone.utc)
+
+
+_slow_log: SlowQueryLog | None = None
+
+
+def install_slow_query_log(engine: Engine | type[Engine], settings: Settings) -> SlowQueryLog:
+    """Attach the process-wide slow-query log to ``engine`` (idempotent).
+
+    Passing the ``Engine`` class covers every engine, including ones built later.
+    """
+    global _slow_log
+    if _slow_log is None:
+        _slow_log = SlowQueryLog(
+            threshold_ms=settings.SLOW_QUERY_MS,
+            explain=settings.SLOW_QUERY_EXPLAIN,
+            explain_interval=settings.SLOW_QUERY_EXPLAIN_INTERVAL,
+        )
+    _slow_log.install(engine)
+    return _slow_log
+
+
+def get_slow_query_log() -> SlowQueryLog | None:
+    return _slow_log
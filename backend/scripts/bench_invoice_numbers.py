@@ -0,0 +1,125 @@
+"""Concurrency check for invoice number allocation.
+
+Drives many parallel invoice creators against DATABASE_URL, then verifies
+that every created ``Invoice.invoice_number`` is unique and reports
+throughput and any numbering gaps:
+
+    DATABASE_URL=postgresql+psycopg://... python scripts/bench_invoice_numbers.py --workers 32 --per-worker 50
+    python scripts/bench_invoice_numbers.py --block 20      # per-worker block pre-allocation
+
+Uses a throwaway year (default 1999) so real numbering is untouched; rows for
+that year are removed before and after the run. Exits non-zero on duplicates
+or failed creations. Run from ``backend/``.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, select  # noqa: E402
+
+from app.db import Base, get_engine, get_session  # noqa: E402
+from app.models import Invoice, InvoiceSequence  # noqa: E402
+from app.services.invoices import create_invoice  # noqa: E402
+from app.services.numbering import find_gaps, get_block_allocator  # noqa: E402
+
+
+def _cleanup(year: int) -> None:
+    with get_session() as db, db.begin():
+        db.execute(delete(Invoice).where(Invoice.invoice_number.like(f"INV-{year}-%")))
+        db.execute(delete(InvoiceSequence).where(InvoiceSequence.year == year))
+
+
+def _creator(worker: int, count: int, year: int, block: int, errors: list) -> int:
+    created = 0
+    for i in range(count):
+        payload = {
+            "name": f"bench {worker}-{i}",
+            "invoice_date": dt.date(year, 1, 1).isoformat(),
+            "items": [{"item": "load test", "quantity": 1, "rate": 10}],
+        }
+        for attempt in range(5):
+            try:
+                with get_session() as db, db.begin():
+                    create_invoice(db, payload, number_block=block)
+                created += 1
+                break
+            except Exception as exc:  # SQLite "database is locked" etc. - retry
+                if attempt == 4:
+                    errors.append(f"worker {worker}: {exc}")
+                time.sleep(0.01 * (attempt + 1))
+    return created
+
+
+def run(workers: int, per_worker: int, year: int = 1999, block: int = 0) -> dict:
+    """Create ``workers * per_worker`` invoices in parallel and check the numbers.
+
+    Rows for ``year`` are removed before and after. Returns counts, gaps,
+    errors and elapsed seconds; also used by ``tests/test_invoice_numbers.py``.
+    """
+    _cleanup(year)
+    errors: list[str] = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_creator, w, per_worker, year, block, errors) for w in range(workers)]
+        created = sum(f.result() for f in futures)
+    if block:
+        get_block_allocator(block).release()
+    elapsed = time.perf_counter() - start
+
+    with get_session() as db:
+        total, distinct = db.execute(
+            select(func.count(Invoice.id), func.count(func.distinct(Invoice.invoice_number))).where(
+                Invoice.invoice_number.like(f"INV-{year}-%")
+            )
+        ).one()
+        gaps = find_gaps(db, year)
+    _cleanup(year)
+    return {
+        "expected": workers * per_worker,
+        "created": created,
+        "total": total,
+        "distinct": distinct,
+        "gaps": gaps,
+        "errors": errors,
+        "elapsed": elapsed,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-worker", type=int, default=25)
+    parser.add_argument("--block", type=int, default=0, help="block pre-allocation size (0 = in-transaction)")
+    parser.add_argument("--year", type=int, default=1999)
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (SQLite scratch DBs)")
+    args = parser.parse_args(argv)
+
+    if args.create_schema:
+        Base.metadata.create_all(get_engine())
+    result = run(args.workers, args.per_worker, args.year, args.block)
+    created, expected, elapsed = result["created"], result["expected"], result["elapsed"]
+    total, distinct, gaps = result["total"], result["distinct"], result["gaps"]
+
+    print(
+        f"{created}/{expected} invoices by {args.workers} workers in {elapsed:.2f}s "
+        f"({created / elapsed:.1f}/s), block={args.block}"
+    )
+    print(f"numbers: {total} rows, {distinct} distinct, {len(gaps)} gaps")
+    for err in result["errors"][:5]:
+        print(f"  error: {err}", file=sys.stderr)
+
+    ok = total == distinct == created == expected
+    if not ok:
+        print("FAILED: duplicate numbers or failed creations", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Benchmark report row building and JSON serialization.
+
+Compares, on a synthetic report (default 100k rows):
+
+- legacy: one dict per row with four round() calls, Flask's stdlib provider
+- slots rows (ReportRow) serialized as objects, stdlib provider
+- slots rows as objects, orjson provider
+- slots rows in the columnar shape, orjson provider
+
+Prints build + serialize time (best of --repeat) and payload size. Run from
+``backend/``.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app.json_provider import OrjsonProvider, orjson  # noqa: E402
+from app.services.reports import ReportRow, rows_payload  # noqa: E402
+
+
+def _synthetic(n: int) -> list[tuple]:
+    rnd = random.Random(42)
+    out = []
+    for i in range(n):
+        spend = round(rnd.uniform(0, 500), 2)
+        revenue = round(rnd.uniform(0, 700), 2) if i % 5 else 0.0
+        out.append((f"Campaign {i:06d} | US | Search", f"campaign {i:06d} us search", spend, revenue, rnd.randint(0, 40)))
+    return out
+
+
+def _legacy_rows(data):
+    rows = []
+    for campaign, name, spend, revenue, leads in data:
+        pl = revenue - spend
+        roi = (revenue / spend * 100.0) if spend and revenue else (0.0 if spend else None)
+        rows.append(
+            {
+                "campaign": campaign,
+                "name": name,
+                "spend": round(spend, 2),
+                "revenue": round(revenue, 2),
+                "pl": round(pl, 2),
+                "roi": (round(roi, 2) if roi is not None else None),
+                "leads": leads,
+            }
+        )
+    return rows
+
+
+def _slot_rows(data):
+    rows = []
+    append = rows.append
+    for campaign, name, spend, revenue, leads in data:
+        roi = (revenue / spend * 100.0) if spend and revenue else (0.0 if spend else None)
+        append(
+            ReportRow(
+                campaign, name, spend, revenue, round(revenue - spend, 2),
+                round(roi, 2) if roi is not None else None, leads,
+            )
+        )
+    return rows
+
+
+def _best(fn, repeat: int) -> tuple[float, bytes]:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0, body
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    data = _synthetic(args.rows)
+    app = Flask(__name__)
+    stdlib = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson is not None else None
+
+    def envelope(rows):
+        return {"report": "google-binom", "rows": rows, "summary": {}}
+
+    cases = [
+        ("legacy dicts + stdlib", lambda: stdlib.response(envelope(_legacy_rows(data))).get_data()),
+        ("slots rows + stdlib", lambda: stdlib.response(envelope(rows_payload(_slot_rows(data)))).get_data()),
+    ]
+    if fast is not None:
+        cases += [
+            ("slots rows + orjson", lambda: fast.response(envelope(rows_payload(_slot_rows(data)))).get_data()),
+            (
+                "slots columns + orjson",
+                lambda: fast.response(envelope(rows_payload(_slot_rows(data), "columns"))).get_data(),
+            ),
+        ]
+    else:
+        print("orjson not installed: skipping orjson cases", file=sys.stderr)
+
+    with app.app_context():
+        results = [(label, *_best(fn, args.repeat)) for label, fn in cases]
+
+    base_ms = results[0][1]
+    print(f"{args.rows} rows, best of {args.repeat}")
+    for label, ms, body in results:
+        print(f"  {label:<24} {ms:9.1f} ms  x{base_ms / ms:4.1f}  {len(body) / 1e6:6.2f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Startup benchmark: import-time profile and time-to-first-response.
+
+Runs each measurement in a fresh interpreter so nothing is warm:
+
+    python scripts/bench_startup.py                  # check the default budgets
+    python scripts/bench_startup.py --budget-import-ms 30 --budget-first-response-ms 600
+    python scripts/bench_startup.py --budget-import-ms 0 --budget-first-response-ms 0  # report only
+
+Exits non-zero when a median exceeds its budget (``0`` disables a budget), so
+CI can gate on it. Run from ``backend/``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Default budgets (median ms). Measured on a dev machine: `import app` ~10 ms,
+# first response ~380 ms (create_app pulls in Flask and SQLAlchemy); the
+# headroom absorbs slower CI runners, not import-time regressions.
+BUDGET_IMPORT_MS = 50.0
+BUDGET_FIRST_RESPONSE_MS = 800.0
+
+# Time-to-first-response: build the app and serve one request in-process.
+# /health does not touch the database, so this measures app startup only.
+_FIRST_RESPONSE_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+resp = flask_app.test_client().get("/health")
+t3 = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(f"{(t1 - t0) * 1000:.3f} {(t2 - t1) * 1000:.3f} {(t3 - t0) * 1000:.3f}")
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite://")
+    env["PYTHONDONTWRITEBYTECODE"] = "0"
+    return env
+
+
+def import_profile(top: int) -> tuple[float, list[dict]]:
+    """Return (total ms for `import app` + create_app, top modules by cumulative time)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app; app.create_app()"],
+        cwd=BACKEND_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, _, rest = line.partition(":")
+        self_us, cumulative_us, name = rest.split("|", 2)
+        name = name[1:]  # drop the separator space; remaining indent is nesting depth
+        modules.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_ms": int(self_us.strip()) / 1000.0,
+                "cumulative_ms": int(cumulative_us.strip()) / 1000.0,
+            }
+        )
+    # Interpreter startup (site, encodings, .pth hooks) is reported before
+    # `app`; only count top-level imports from `app` onwards.
+    start = next(i for i, m in enumerate(modules) if m["depth"] == 0 and m["module"] == "app")
+    modules = modules[start:]
+    total_ms = sum(m["cumulative_ms"] for m in modules if m["depth"] == 0)
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return total_ms, modules[:top]
+
+
+def first_response(runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", _FIRST_RESPONSE_SNIPPET],
+            cwd=BACKEND_DIR,
+            env=_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        import_ms, create_ms, total_ms = (float(v) for v in proc.stdout.split())
+        samples.append({"import_ms": import_ms, "create_app_ms": create_ms, "first_response_ms": total_ms})
+    return {
+        key: round(statistics.median(s[key] for s in samples), 3)
+        for key in ("import_ms", "create_app_ms", "first_response_ms")
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="modules to show from -X importtime")
+    parser.add_argument("--budget-import-ms", type=float, default=BUDGET_IMPORT_MS, help="0 disables")
+    parser.add_argument(
+        "--budget-first-response-ms", type=float, default=BUDGET_FIRST_RESPONSE_MS, help="0 disables"
+    )
+    parser.add_argument("--json", dest="json_path", default=None, help="write results to this file")
+    args = parser.parse_args(argv)
+
+    importtime_total, top_modules = import_profile(args.top)
+    timings = first_response(args.runs)
+
+    print(f"-X importtime (import app + create_app): {importtime_total:.1f} ms")
+    for m in top_modules:
+        print(f"  {m['cumulative_ms']:9.1f} ms  {m['self_ms']:8.1f} ms self  {m['module']}")
+    print(
+        f"median of {args.runs}: import app {timings['import_ms']:.1f} ms, "
+        f"create_app {timings['create_app_ms']:.1f} ms, "
+        f"first response {timings['first_response_ms']:.1f} ms"
+    )
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump({"importtime_total_ms": importtime_total, "top_modules": top_modules, **timings}, fh, indent=2)
+
+    failures = []
+    if args.budget_import_ms and timings["import_ms"] > args.budget_import_ms:
+        failures.append(f"import app {timings['import_ms']:.1f} ms > budget {args.budget_import_ms:.1f} ms")
+    if args.budget_first_response_ms and timings["first_response_ms"] > args.budget_first_response_ms:
+        failures.append(
+            f"first response {timings['first_response_ms']:.1f} ms > budget {args.budget_first_response_ms:.1f} ms"
+        )
+    for failure in failures:
+        print(f"BUDGET EXCEEDED: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
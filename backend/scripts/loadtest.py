@@ -0,0 +1,457 @@
+"""Mixed-workload load test.
+
+Seeds DATABASE_URL with synthetic Google/Binom periods, then runs concurrent
+clients against the app for a fixed duration and reports throughput and
+p50/p95/p99 latency per endpoint:
+
+    python scripts/loadtest.py --create-schema --seed-periods 8 --seed-rows 5000 --duration 30
+    python scripts/loadtest.py --concurrency 16 --mix report=50,batches=20,upload=10,delete=10,invoice=10
+    python scripts/loadtest.py --url http://127.0.0.1:5000 --out results/v0.4.json --compare results/v0.3.json
+
+Without ``--url`` the app runs in-process (Flask test client, one per
+thread), so nothing but the database is needed; with ``--url`` requests go
+over HTTP to a running server that uses the same DATABASE_URL.
+
+Workload, per operation picked by weight from ``--mix``:
+
+- report:  ``GET /api/reports/google-binom`` for a random seeded period
+- batches: ``GET /api/<source>/batches``
+- upload:  ``POST /api/uploads/google`` with a ``--upload-rows`` CSV
+- delete:  ``DELETE /api/uploads/<id>`` of an earlier load-test upload
+- invoice: create, list, read, update and delete one invoice
+
+Synthetic data lives in throwaway periods (seeded reports in 2001, uploads in
+2002, invoices dated 1998) and is removed before and after the run unless
+``--keep`` is given. Results are printed and, with ``--out``, written as JSON
+so runs can be compared across releases. Run from ``backend/``.
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import http.client
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, or_  # noqa: E402
+
+from app.db import Base, get_engine, get_session  # noqa: E402
+from app.models import BinomGoogleSpentData, DatasetBatch, GoogleData, Invoice, InvoiceSequence, Upload  # noqa: E402
+from app.partitions import ensure_partition  # noqa: E402
+from app.services.catalog import record_ingest  # noqa: E402
+from app.services.matching import identity  # noqa: E402
+
+SEED_START = dt.date(2001, 1, 1)  # a Monday; seeded weekly periods follow it
+UPLOAD_START = dt.date(2002, 1, 7)
+INVOICE_YEAR = 1998
+FILENAME_PREFIX = "loadtest-"
+DEFAULT_MIX = "report=50,batches=20,upload=10,delete=10,invoice=10"
+INSERT_CHUNK = 5000
+
+
+# -- seeding ------------------------------------------------------------------
+
+
+def _periods(n: int) -> list[tuple[dt.date, dt.date]]:
+    return [(SEED_START + dt.timedelta(weeks=i), SEED_START + dt.timedelta(weeks=i, days=6)) for i in range(n)]
+
+
+def _campaign(i: int) -> str:
+    return f"LT {i:06d} | US | Search"
+
+
+def seed(periods: list[tuple[dt.date, dt.date]], rows: int, rnd: random.Random) -> None:
+    """Insert ``rows`` Google rows per period and matching Binom rows (~90% matched)."""
+    now = dt.datetime.now(dt.timezone.utc)
+    for date_from, date_to in periods:
+        ensure_partition(GoogleData.__tablename__, date_from)
+        ensure_partition(BinomGoogleSpentData.__tablename__, date_from)
+        with get_session() as db, db.begin():
+            meta = {"date_from": date_from, "date_to": date_to, "report_type": "weekly"}
+            for source, model in (("google", GoogleData), ("binom-google", BinomGoogleSpentData)):
+                upload = Upload(
+                    source_type=source, filename=f"{FILENAME_PREFIX}seed.csv", checksum=None, uploaded_at=now
+                )
+                db.add(upload)
+                db.flush()
+                if source == "google":
+                    batch = [
+                        {**meta, "upload_id": upload.id, "account_name": f"LT Account {i % 25}",
+                         "campaign": _campaign(i), "cost": round(rnd.uniform(1, 500), 2)}
+                        for i in range(rows)
+                    ]
+                    for r in batch:
+                        r["campaign_id"], r["name_key"] = identity(r["campaign"])
+                    spend, revenue = sum(r["cost"] for r in batch), 0.0
+                else:
+                    # Most campaigns match (different case/punctuation), a few are Binom-only
+                    batch = [
+                        {**meta, "upload_id": upload.id, "name": _campaign(i).lower().replace(" | ", " "),
+                         "leads": rnd.randint(0, 40), "revenue": round(rnd.uniform(0, 700), 2)}
+                        for i in range(rows)
+                        if i % 10 or i % 20 == 0
+                    ]
+                    for r in batch:
+                        r["campaign_id"], r["name_key"] = identity(r["name"])
+                    spend, revenue = 0.0, sum(r["revenue"] for r in batch)
+                for start in range(0, len(batch), INSERT_CHUNK):
+                    db.execute(insert(model), batch[start : start + INSERT_CHUNK])
+                record_ingest(db, source, date_from, date_to, "weekly", upload.id, now, len(batch), spend, revenue)
+
+
+def cleanup() -> None:
+    with get_session() as db, db.begin():
+        # Dataset rows go with their upload (ON DELETE CASCADE)
+        db.execute(delete(Upload).where(Upload.filename.like(f"{FILENAME_PREFIX}%")))
+        db.execute(
+            delete(DatasetBatch).where(
+                or_(
+                    DatasetBatch.date_from.between(SEED_START, SEED_START.replace(year=SEED_START.year + 1)),
+                    DatasetBatch.date_from.between(UPLOAD_START, UPLOAD_START.replace(year=UPLOAD_START.year + 1)),
+                )
+            )
+        )
+        db.execute(delete(Invoice).where(Invoice.invoice_number.like(f"INV-{INVOICE_YEAR}-%")))
+        db.execute(delete(InvoiceSequence).where(InvoiceSequence.year == INVOICE_YEAR))
+
+
+# -- clients ------------------------------------------------------------------
+
+
+class InProcessClient:
+    def __init__(self, app) -> None:
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None):
+        resp = self._client.open(path, method=method, data=body, headers=headers or {})
+        return resp.status_code, resp.get_data()
+
+
+class HttpClient:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base_url: str) -> None:
+        parts = urlsplit(base_url)
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self._conn = conn_cls(parts.netloc, timeout=120)
+        self._prefix = parts.path.rstrip("/")
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None):
+        try:
+            self._conn.request(method, self._prefix + path, body=body, headers=headers or {})
+            resp = self._conn.getresponse()
+            return resp.status, resp.read()
+        except (http.client.HTTPException, OSError):
+            self._conn.close()  # reconnect on next request
+            raise
+
+
+def _multipart(fields: dict[str, str], filename: str, content: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: text/csv\r\n\r\n".encode()
+        + content
+        + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# -- workload -----------------------------------------------------------------
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.status: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def timed(self, client, label: str, method: str, path: str, body=None, headers=None, ok=(200, 201, 202)):
+        start = time.perf_counter()
+        try:
+            status, data = client.request(method, path, body, headers)
+        except Exception:
+            status, data = 0, b""
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self.latencies[label].append(elapsed_ms)
+            self.status[label][status] += 1
+            if status not in ok:
+                self.errors[label] += 1
+        return status, data
+
+
+class Workload:
+    def __init__(self, args, periods: list[tuple[dt.date, dt.date]], recorder: Recorder) -> None:
+        self.args = args
+        self.periods = periods
+        self.rec = recorder
+        self.uploads: list[int] = []  # ids available for the delete operation
+        self._upload_seq = itertools.count()
+        self._lock = threading.Lock()
+        ops, weights = [], []
+        for item in args.mix.split(","):
+            name, _, weight = item.partition("=")
+            if not hasattr(self, f"op_{name.strip()}"):
+                raise SystemExit(f"unknown operation in --mix: {name!r}")
+            ops.append(getattr(self, f"op_{name.strip()}"))
+            weights.append(float(weight or 1))
+        self.ops, self.weights = ops, weights
+
+    def run(self, client, rnd: random.Random, deadline: float) -> None:
+        while time.perf_counter() < deadline:
+            rnd.choices(self.ops, self.weights)[0](client, rnd)
+
+    def op_report(self, client, rnd):
+        date_from, date_to = rnd.choice(self.periods)
+        shape = "columns" if rnd.random() < 0.5 else "rows"
+        path = f"/api/reports/google-binom?report_type=weekly&date_from={date_from}&date_to={date_to}&shape={shape}"
+        self.rec.timed(client, "GET /api/reports/google-binom", "GET", path, headers={"Accept-Encoding": "gzip"})
+
+    def op_batches(self, client, rnd):
+        source = rnd.choice(("google", "binom-google"))
+        self.rec.timed(client, "GET /api/<source>/batches", "GET", f"/api/{source}/batches?limit=20")
+
+    def op_upload(self, client, rnd):
+        n = next(self._upload_seq)
+        date_from = UPLOAD_START + dt.timedelta(weeks=n % 52)
+        csv = "Account,Campaign,Cost\n" + "".join(
+            f"LT Account {i % 25},{_campaign(i)},{rnd.uniform(1, 500):.2f}\n" for i in range(self.args.upload_rows)
+        )
+        body, content_type = _multipart(
+            {"date_from": str(date_from), "date_to": str(date_from + dt.timedelta(days=6)), "report_type": "weekly"},
+            f"{FILENAME_PREFIX}{n}.csv",
+            csv.encode(),
+        )
+        status, data = self.rec.timed(
+            client, "POST /api/uploads/<source>", "POST", "/api/uploads/google", body, {"Content-Type": content_type}
+        )
+        if status == 200:
+            with self._lock:
+                self.uploads.append(json.loads(data)["upload_id"])
+
+    def op_delete(self, client, rnd):
+        with self._lock:
+            upload_id = self.uploads.pop(rnd.randrange(len(self.uploads))) if self.uploads else None
+        if upload_id is None:
+            return self.op_upload(client, rnd)  # nothing to delete yet
+        self.rec.timed(client, "DELETE /api/uploads/<id>", "DELETE", f"/api/uploads/{upload_id}")
+
+    def op_invoice(self, client, rnd):
+        headers = {"Content-Type": "application/json"}
+        payload = {
+            "name": "Load Test",
+            "bill_to": f"LT Client {rnd.randrange(50)}",
+            "invoice_date": dt.date(INVOICE_YEAR, rnd.randint(1, 12), rnd.randint(1, 28)).isoformat(),
+            "items": [{"item": f"line {i}", "quantity": 1, "rate": rnd.randint(10, 500)} for i in range(3)],
+        }
+        status, data = self.rec.timed(
+            client, "POST /api/invoices", "POST", "/api/invoices", json.dumps(payload).encode(), headers
+        )
+        if status != 201:
+            return
+        invoice_id = json.loads(data)["id"]
+        self.rec.timed(client, "GET /api/invoices", "GET", f"/api/invoices?limit=50&date_from={INVOICE_YEAR}-01-01")
+        self.rec.timed(client, "GET /api/invoices/<id>", "GET", f"/api/invoices/{invoice_id}")
+        self.rec.timed(
+            client, "PATCH /api/invoices/<id>", "PATCH", f"/api/invoices/{invoice_id}",
+            json.dumps({"notes": "updated by load test"}).encode(), headers,
+        )
+        self.rec.timed(client, "DELETE /api/invoices/<id>", "DELETE", f"/api/invoices/{invoice_id}", ok=(200, 204))
+
+
+# -- reporting ----------------------------------------------------------------
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(rec: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for label, values in sorted(rec.latencies.items()):
+        values = sorted(values)
+        endpoints[label] = {
+            "requests": len(values),
+            "errors": rec.errors.get(label, 0),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "p99_ms": round(_percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2),
+            "status": {str(k): v for k, v in sorted(rec.status[label].items())},
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def print_table(summary: dict, baseline: dict | None = None) -> None:
+    header = f"{'endpoint':34} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    if baseline:
+        header += f" {'Δp95':>8} {'Δrps':>8}"
+    print(header)
+    base_eps = (baseline or {}).get("results", {}).get("endpoints", {})
+    for label, e in summary["endpoints"].items():
+        line = (
+            f"{label:34} {e['requests']:7d} {e['errors']:5d} {e['throughput_rps']:8.1f} "
+            f"{e['p50_ms']:8.1f} {e['p95_ms']:8.1f} {e['p99_ms']:8.1f} {e['max_ms']:8.1f}"
+        )
+        if baseline:
+            b = base_eps.get(label)
+            line += (
+                f" {_delta(e['p95_ms'], b['p95_ms']):>8} {_delta(e['throughput_rps'], b['throughput_rps']):>8}"
+                if b
+                else f" {'-':>8} {'-':>8}"
+            )
+        print(line)
+    print(
+        f"total: {summary['requests']} requests, {summary['errors']} errors, "
+        f"{summary['throughput_rps']:.1f} req/s over {summary['elapsed_s']:.1f}s"
+    )
+
+
+def _delta(new: float, old: float) -> str:
+    return f"{(new - old) / old * 100:+.0f}%" if old else "-"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process test client)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of measured load")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--seed-periods", type=int, default=8, help="weekly periods to seed")
+    parser.add_argument("--seed-rows", type=int, default=5000, help="Google rows per seeded period")
+    parser.add_argument("--upload-rows", type=int, default=500, help="rows per uploaded CSV")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--create-schema", action="store_true", help="create tables first (SQLite scratch DBs)")
+    parser.add_argument("--keep", action="store_true", help="leave synthetic data in place afterwards")
+    parser.add_argument("--out", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="earlier --out file to show p95/throughput deltas against")
+    parser.add_argument("--verbose", action="store_true", help="keep the in-process slow-query log output")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Under saturation nearly every write crosses SLOW_QUERY_MS; the table is the report
+        logging.getLogger("app.slowlog").setLevel(logging.ERROR)
+
+    engine = get_engine()
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+    rnd = random.Random(args.random_seed)
+    periods = _periods(args.seed_periods)
+
+    cleanup()
+    t0 = time.perf_counter()
+    seed(periods, args.seed_rows, rnd)
+    print(f"seeded {len(periods)} periods x {args.seed_rows} rows in {time.perf_counter() - t0:.1f}s ({engine.dialect.name})")
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        from app import create_app
+
+        app = create_app()
+
+        def make_client():
+            return InProcessClient(app)
+
+    started_at = dt.datetime.now(dt.timezone.utc)  # before warmup, for --compare metadata
+    try:
+        results = None
+        for phase, seconds in (("warmup", args.warmup), ("measure", args.duration)):
+            if seconds <= 0:
+                continue
+            rec = Recorder()
+            workload = Workload(args, periods, rec)
+            deadline = time.perf_counter() + seconds
+            threads = [
+                threading.Thread(
+                    target=workload.run,
+                    args=(make_client(), random.Random(args.random_seed + i), deadline),
+                    name=f"loadtest-{i}",
+                )
+                for i in range(args.concurrency)
+            ]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            if phase == "measure":
+                results = summarize(rec, time.perf_counter() - start)
+    finally:
+        if not args.keep:
+            cleanup()
+
+    if results is None:
+        print("no measured phase (--duration 0)")
+        return 0
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_table(results, baseline)
+
+    if args.out:
+        report = {
+            "started_at": started_at.isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "target": args.url or "in-process",
+            "config": {
+                k: getattr(args, k)
+                for k in ("concurrency", "duration", "warmup", "mix", "seed_periods", "seed_rows", "upload_rows")
+            },
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"wrote {args.out}")
+    return 1 if results["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
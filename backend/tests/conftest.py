@@ -0,0 +1,31 @@
+"""Shared setup: a scratch SQLite database for the whole session.
+
+``DATABASE_URL`` must be set before ``app.db`` builds its engine, so it is
+set here at import time, before any test module imports the app.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+_DB_DIR = tempfile.mkdtemp(prefix="report-system-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("SNAPSHOTS", "0")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    import app.models  # noqa: F401  (registers tables on Base.metadata)
+    from app.db import Base, get_engine
+
+    engine = get_engine()
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,16 @@
+"""Invoice numbers stay unique and gapless under concurrent creation (SQLite)."""
+from __future__ import annotations
+
+import pytest
+
+import bench_invoice_numbers
+
+
+@pytest.mark.parametrize("block", [0, 5])
+def test_parallel_allocation_unique_and_gapless(engine, block):
+    result = bench_invoice_numbers.run(workers=8, per_worker=10, year=1999, block=block)
+
+    assert result["errors"] == []
+    assert result["created"] == result["expected"] == 80
+    assert result["total"] == result["distinct"] == 80
+    assert result["gaps"] == []
@@ -0,0 +1,52 @@
+"""Startup stays lazy and within the bench_startup.py budgets.
+
+Both checks run in fresh interpreters: anything imported by an earlier test
+would otherwise hide an eager import.
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Optional or heavy dependencies that must load on first use, not at startup
+HEAVY_MODULES = ("weasyprint", "pandas", "numpy", "zstandard")
+
+_LAZY_SNIPPET = f"""
+import json, sys
+import app
+flask_app = app.create_app()
+resp = flask_app.test_client().get("/health")
+import app.db
+print(json.dumps({{
+    "status": resp.status_code,
+    "engine_built": app.db._engine is not None,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, env=dict(os.environ), capture_output=True, text=True, timeout=300
+    )
+
+
+def test_startup_imports_nothing_heavy_and_leaves_engine_unbuilt():
+    proc = _run(["-c", _LAZY_SNIPPET])
+    assert proc.returncode == 0, proc.stderr
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert result["status"] == 200
+    assert result["heavy"] == []
+    # /health never touches the database, so no engine (or DB driver) yet
+    assert result["engine_built"] is False
+
+
+def test_startup_within_budget():
+    # Default budgets of scripts/bench_startup.py; exit status 1 when exceeded
+    proc = _run([os.path.join("scripts", "bench_startup.py"), "--runs", "3", "--top", "0"])
+    assert proc.returncode == 0, proc.stdout + proc.stderr